@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Per-click latency of the dashboard's Back/Forward chart paging.
+Replays the same clicks (back to the first week, then forward to the
+latest) against a copy of decisions.db and times the work each click does:
+
+- full rerun, uncached: the whole script reloads and re-renders everything
+  (the dashboard before result caching)
+- full rerun, cached: the whole script reruns over the cache layers
+- chart fragment: only chart_section reruns, drawing each window
+- chart fragment, tiles: only chart_section reruns, serving the tiles the
+  processor pre-renders (the current dashboard)
+
+The first visit to each chart window is a chart-cache miss in the cached
+modes, so both the median and the worst click are printed.
+
+    python benchmarks/bench_chart_paging.py
+    python benchmarks/bench_chart_paging.py --db path/to/decisions.db
+"""
+
+import argparse
+import logging
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+WEB_DIR = os.path.join(BASE_DIR, "..", "visa-dashboard-web")
+sys.path.insert(0, os.path.join(BASE_DIR, "..", "data_pipline"))
+sys.path.insert(0, WEB_DIR)
+
+import charts  # noqa: E402
+import dashboard  # noqa: E402
+import db  # noqa: E402
+import db_conn  # noqa: E402
+
+# st.cache_data works without a Streamlit server but warns on every call
+logging.getLogger("streamlit.runtime.caching.cache_data_api").setLevel(logging.ERROR)
+
+
+def full_rerun_uncached(db_path, start):
+    version = db_conn.data_version(db_conn.connect(db_path))
+    summary = dashboard.load_summary.__wrapped__(db_path, version)
+    adv_summary = dashboard.advanced_stats(summary)
+    summary.iloc[::-1].reset_index(drop=True)
+    adv_summary.iloc[::-1].reset_index(drop=True)
+    charts.render_png(summary, start)
+    summary["Total_3wk_MA"] = adv_summary["Total_3wk_MA"]
+    summary["Total_pct_change"] = adv_summary["Total_pct_change"]
+    summary.to_csv(index=False).encode("utf-8")
+    dashboard.load_decisions.__wrapped__(db_path, version).to_csv(index=False).encode("utf-8")
+
+
+def full_rerun_cached(db_path, start):
+    version = db_conn.data_version(db_conn.connect(db_path))
+    summary = dashboard.load_summary(db_path, version)
+    adv_summary = dashboard.load_advanced_stats(db_path, version)
+    summary.iloc[::-1].reset_index(drop=True)
+    adv_summary.iloc[::-1].reset_index(drop=True)
+    dashboard.chart_png(db_path, version, start)
+    dashboard.summary_csv(db_path, version)
+    dashboard.full_csv(db_path, version)
+
+
+def fragment_rerun(db_path, start, version):
+    # chart_section's body, with the data version from the last full run
+    dashboard.load_summary(db_path, version)
+    dashboard.chart_png(db_path, version, start)
+
+
+def click_starts(n_weeks, window=charts.CHART_WINDOW):
+    """Window starts after each click: Back to the first week, then Forward."""
+    start = charts.default_start(n_weeks, window)
+    starts = []
+    while start > 0:
+        start = max(0, start - window)
+        starts.append(start)
+    while start < charts.default_start(n_weeks, window):
+        start = min(n_weeks - window, start + window)
+        starts.append(start)
+    return starts
+
+
+def time_clicks(label, click, starts):
+    latencies = []
+    for start in starts:
+        t0 = time.perf_counter()
+        click(start)
+        latencies.append(time.perf_counter() - t0)
+    print(f"{label:<22} {len(starts):3} clicks  median {statistics.median(latencies) * 1000:8.1f} ms  "
+          f"worst {max(latencies) * 1000:8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time Back/Forward chart paging on the dashboard")
+    parser.add_argument("--db", default=os.path.join(WEB_DIR, "decisions.db"), help="Database to copy and page through")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # a copy, since db_conn switches the file to WAL
+        db_path = os.path.join(tmp, "decisions.db")
+        shutil.copy(args.db, db_path)
+        conn = db_conn.connect(db_path)
+        # bring the copy to the schema the processor renders tiles from;
+        # the copy has no tile store next to it, so the modes before
+        # "tiles" draw every window
+        db.migrate(conn)
+        version = db_conn.data_version(conn)
+        n_weeks = len(dashboard.load_summary.__wrapped__(db_path, version))
+        starts = click_starts(n_weeks)
+        if not starts:
+            print(f"Only {n_weeks} week(s) in {os.path.basename(args.db)}, nothing to page through")
+            return
+        if any(charts.get_tile(conn, version, start) is not None for start in starts):
+            sys.exit("Tiles are being served before they were rendered; the no-tile timings would be tile hits")
+        print(f"Paging through {n_weeks} weeks in windows of {charts.CHART_WINDOW}")
+
+        time_clicks("full rerun, uncached", lambda start: full_rerun_uncached(db_path, start), starts)
+
+        # each cached mode starts from a freshly opened page
+        dashboard.clear_caches()
+        full_rerun_cached(db_path, charts.default_start(n_weeks))
+        time_clicks("full rerun, cached", lambda start: full_rerun_cached(db_path, start), starts)
+
+        dashboard.clear_caches()
+        full_rerun_cached(db_path, charts.default_start(n_weeks))
+        time_clicks("chart fragment", lambda start: fragment_rerun(db_path, start, version), starts)
+
+        # what the processor does after an ingest
+        started = time.perf_counter()
+        count = charts.render_tiles(conn)
+        print(f"{'(render tiles)':<22} {count:3} tiles   total  {(time.perf_counter() - started) * 1000:8.1f} ms")
+        dashboard.clear_caches()
+        full_rerun_cached(db_path, charts.default_start(n_weeks))
+        dashboard.cache_counters().clear()
+        time_clicks("chart fragment, tiles", lambda start: fragment_rerun(db_path, start, version), starts)
+        print("\nCache layers during the fragment clicks:")
+        print(dashboard.cache_stats().to_string(index=False))
+        db_conn.close_all()
+
+
+if __name__ == "__main__":
+    main()
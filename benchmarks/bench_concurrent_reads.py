@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Concurrency check for decisions.db: can the dashboard read while a large
+ingest is running?
+
+A writer process inserts n rows into a copy of decisions.db inside one
+transaction (like processor.insert_into_db on a big PDF) while this process
+keeps running the dashboard's decisions read (load_decisions, bypassing its
+result cache so every read goes to SQLite). It runs twice: once with the old
+plain sqlite3.connect and rollback journal, once through db_conn (WAL). For
+each it prints how many reads finished while the write was in progress,
+how many failed and the worst read latency.
+
+    python benchmarks/bench_concurrent_reads.py            # 20,000 rows, a quick check
+    python benchmarks/bench_concurrent_reads.py --large    # 1,000,000 rows
+    python benchmarks/bench_concurrent_reads.py -n 200000
+
+Exits non-zero if any WAL read failed or no WAL read finished during the
+write.
+"""
+
+import argparse
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+WEB_DIR = os.path.join(BASE_DIR, "..", "visa-dashboard-web")
+sys.path.insert(0, os.path.join(BASE_DIR, "..", "data_pipline"))
+sys.path.insert(0, WEB_DIR)
+
+import pandas as pd  # noqa: E402
+
+import dashboard  # noqa: E402
+import db_conn  # noqa: E402
+import processor  # noqa: E402
+from synthetic import WEEK, synthetic_rows  # noqa: E402
+
+READ_SQL = "SELECT app_number, decision, week, start_date, end_date FROM decisions"
+DEFAULT_ROWS = 20_000
+LARGE_ROWS = 1_000_000
+
+
+# the dashboard's read before db_conn: a fresh connection per query, no WAL
+def legacy_read(db_path, msg_path):
+    conn = sqlite3.connect(db_path)
+    df = pd.read_sql_query(READ_SQL, conn)
+    conn.close()
+    return df
+
+
+def wal_read(db_path, msg_path):
+    # load_decisions without its st.cache_data layer: a cache hit would
+    # never touch SQLite, so it would "read" through any lock
+    return dashboard.load_decisions.__wrapped__(db_path)
+
+
+def writer(db_path, wal, n, started, finished):
+    rows = synthetic_rows(n)
+    if wal:
+        conn = processor.init_db(db_path)
+    else:
+        conn = sqlite3.connect(db_path)
+    started.set()
+    processor.insert_rows(conn, rows, *WEEK)
+    conn.commit()
+    finished.set()
+
+
+def run(label, wal, n, source_db):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "decisions.db")
+        msg_path = os.path.join(tmp, "message.txt")
+        shutil.copy(source_db, db_path)
+        open(msg_path, "w").close()
+        # both writers need the pipeline's tables (settings for the data version)
+        processor.init_db(db_path)
+        db_conn.close_all()
+        conn = sqlite3.connect(db_path)
+        conn.execute(f"PRAGMA journal_mode = {'WAL' if wal else 'DELETE'}")
+        conn.close()
+        read = wal_read if wal else legacy_read
+
+        ctx = multiprocessing.get_context("spawn")
+        started, finished = ctx.Event(), ctx.Event()
+        proc = ctx.Process(target=writer, args=(db_path, wal, n, started, finished))
+        proc.start()
+        started.wait()
+        write_started = time.perf_counter()
+
+        latencies, errors, during = [], [], 0
+        while not finished.is_set():
+            t0 = time.perf_counter()
+            try:
+                rows = len(read(db_path, msg_path))
+            except Exception as e:
+                errors.append(f"{type(e).__name__}: {e}")
+                continue
+            latencies.append(time.perf_counter() - t0)
+            if not finished.is_set():
+                during += 1
+        write_seconds = time.perf_counter() - write_started
+        proc.join()
+        db_conn.close_all()
+
+    worst = max(latencies) if latencies else float("nan")
+    median = statistics.median(latencies) if latencies else float("nan")
+    print(f"{label:<16} write {write_seconds:6.2f}s  reads during write {during:5}  "
+          f"failed {len(errors):3}  median {median * 1000:7.1f} ms  worst {worst * 1000:8.1f} ms  "
+          f"last read {rows if latencies else '-'} rows")
+    for error in sorted(set(errors)):
+        print(f"{'':<16} {error}")
+    return during, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check dashboard reads during a large ingest")
+    parser.add_argument("-n", type=int, default=DEFAULT_ROWS, help=f"Rows inserted by the writer (default {DEFAULT_ROWS:,})")
+    parser.add_argument("--large", action="store_const", dest="n", const=LARGE_ROWS,
+                        help=f"Insert {LARGE_ROWS:,} rows, like a very large PDF")
+    parser.add_argument("--db", default=os.path.join(WEB_DIR, "decisions.db"), help="Database to copy as the starting point")
+    args = parser.parse_args()
+
+    print(f"Inserting {args.n:,} rows in one transaction while reading {os.path.basename(args.db)}")
+    run("rollback journal", False, args.n, args.db)
+    during, errors = run("WAL (db_conn)", True, args.n, args.db)
+    if errors or not during:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
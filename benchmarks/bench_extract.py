@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark for the PDF extraction engines in data_pipline/extractors.py.
+Parses every PDF in a folder (the processed archive by default) with each
+engine, prints pages/sec, and checks the rows match the "table" engine
+row for row.
+
+    python benchmarks/bench_extract.py
+    python benchmarks/bench_extract.py path/to/pdfs
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BASE_DIR, "..", "data_pipline"))
+
+import extractors  # noqa: E402
+import processor  # noqa: E402
+
+ARCHIVE_DIR = os.path.abspath(os.path.join(BASE_DIR, "..", "data", "pdf", "processed"))
+
+
+def run_engine(filepath, engine):
+    """Return (rows, pages, seconds, fallback pages) for one PDF."""
+    out = io.StringIO()
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(out):
+        page_rows = list(processor.iter_page_rows(filepath, engine=engine))
+    elapsed = time.perf_counter() - started
+    rows = [row for _, page in page_rows for row in page]
+    fallbacks = out.getvalue().count("(table)") if engine != "table" else 0
+    return rows, len(page_rows), elapsed, fallbacks
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark PDF extraction engines")
+    parser.add_argument("folder", nargs="?", default=ARCHIVE_DIR, help="Folder of SAVD PDFs")
+    args = parser.parse_args()
+
+    files = sorted(f for f in os.listdir(args.folder) if f.lower().endswith(".pdf"))
+    if not files:
+        print(f"No PDFs in {args.folder}")
+        return 1
+
+    engines = ["table"] + [e for e in sorted(extractors.ENGINE_VERSIONS) if e != "table"]
+    totals = {engine: [0, 0.0, 0] for engine in engines}
+    mismatches = []
+
+    for filename in files:
+        filepath = os.path.join(args.folder, filename)
+        reference = None
+        for engine in engines:
+            rows, pages, elapsed, fallbacks = run_engine(filepath, engine)
+            totals[engine][0] += pages
+            totals[engine][1] += elapsed
+            totals[engine][2] += fallbacks
+            if reference is None:
+                reference = rows
+            elif rows != reference:
+                mismatches.append((filename, engine, len(reference), len(rows)))
+
+    print(f"{len(files)} PDF(s) from {args.folder}")
+    for engine in engines:
+        pages, elapsed, fallbacks = totals[engine]
+        line = f"{engine:<6} {pages:>6} pages  {elapsed:8.2f}s  {pages / elapsed:8.1f} pages/sec"
+        if engine != "table":
+            line += f"  {totals['table'][1] / elapsed:5.1f}x  {fallbacks} page(s) fell back to table"
+        print(line)
+
+    if mismatches:
+        print("Row mismatches against table:")
+        for filename, engine, expected, got in mismatches:
+            print(f"  {filename}: {engine} gave {got} rows, table gave {expected}")
+        return 1
+    print("All engines match table row for row.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
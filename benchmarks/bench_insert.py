@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark for processor.insert_rows against the old per-row INSERT loop.
+Loads a synthetic set of decision rows into a throwaway decisions.db with
+each implementation and prints rows/sec.
+
+    python benchmarks/bench_insert.py            # 1,000,000 rows
+    python benchmarks/bench_insert.py -n 100000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BASE_DIR, "..", "data_pipline"))
+
+import decisions_schema  # noqa: E402
+import processor  # noqa: E402
+from synthetic import WEEK, synthetic_rows  # noqa: E402
+
+
+# one INSERT per row, as processor.insert_into_db did before insert_rows;
+# it writes decision_rows, since the decisions view does not count changes
+def legacy_insert(conn, rows, week, start_date, end_date, filename):
+    cur = conn.cursor()
+    week_id = decisions_schema.week_id(conn, week, start_date, end_date)
+    file_id = decisions_schema.file_id(conn, filename)
+    codes = {}
+    new_rows = 0
+    for row in rows:
+        try:
+            if row[1] not in codes:
+                codes[row[1]] = decisions_schema.decision_code(conn, row[1])
+            cur.execute(processor.INSERT_SQL, (row[0], codes[row[1]], week_id, file_id))
+            if cur.rowcount > 0:
+                new_rows += 1
+        except Exception as e:
+            print(f"Error inserting row: {row} | {e}")
+    return new_rows
+
+
+def time_insert(label, insert, rows):
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = processor.init_db(os.path.join(tmp, "decisions.db"))
+        started = time.perf_counter()
+        inserted = insert(conn, rows, *WEEK)
+        conn.commit()
+        elapsed = time.perf_counter() - started
+        stored = conn.execute("SELECT COUNT(*) FROM decisions").fetchone()[0]
+        conn.close()
+
+    assert inserted == stored == len(rows), (label, inserted, stored)
+    print(f"{label:<8} {len(rows):>10,} rows  {elapsed:8.2f}s  {len(rows) / elapsed:>12,.0f} rows/sec")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark decisions inserts")
+    parser.add_argument("-n", "--rows", type=int, default=1_000_000, help="Synthetic rows to load")
+    args = parser.parse_args()
+
+    rows = synthetic_rows(args.rows)
+    legacy = time_insert("loop", legacy_insert, rows)
+    bulk = time_insert("bulk", processor.insert_rows, rows)
+    print(f"speed-up: {legacy / bulk:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
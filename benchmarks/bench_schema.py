@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Size and query times of the legacy decisions table against the compact
+schema (see decisions_schema). Builds a synthetic multi-year decisions.db
+in the legacy layout, migrates a copy, VACUUMs both with the same page size
+and times the same reads on each:
+
+- load: the rows dashboard.load_decisions reads, fetched in full (the
+  decisions table on the legacy schema; decision_rows, decision_codes and
+  weeks as integers on the compact one)
+- weekly aggregate: weekly_summary's from-scratch aggregation (strings
+  grouped on the legacy table, integer ids on the compact one)
+- lookup: application-number lookups, as the dashboard runs them
+- pandas: dashboard.load_decisions plus compute_stats
+
+    python benchmarks/bench_schema.py                       # 5 years, 1,000 decisions a week
+    python benchmarks/bench_schema.py --years 10 --per-week 2000
+"""
+
+import argparse
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BASE_DIR, "..", "data_pipline"))
+sys.path.insert(0, os.path.join(BASE_DIR, "..", "visa-dashboard-web"))
+
+import db  # noqa: E402
+import decisions_schema  # noqa: E402
+import weekly_summary  # noqa: E402
+from synthetic import synthetic_weeks  # noqa: E402
+
+# weekly_summary.AGGREGATE_SQL as it was on the legacy table
+LEGACY_AGGREGATE_SQL = """
+    SELECT week, MIN(start_date), MIN(end_date),
+           SUM(d = 'approved'), SUM(d = 'refused'), SUM(d IN ('approved', 'refused')),
+           COUNT(*),
+           ROUND(100.0 * SUM(d = 'refused') / NULLIF(SUM(d IN ('approved', 'refused')), 0), 2)
+    FROM (SELECT week, start_date, end_date, lower(trim(decision)) AS d FROM decisions)
+    GROUP BY week
+"""
+LOAD_SQL = "SELECT app_number, decision, week, start_date, end_date FROM decisions"
+# what dashboard.read_compact_decisions reads instead of the decisions view
+COMPACT_LOAD_SQL = [
+    "SELECT app_number, decision, week_id FROM decision_rows",
+    "SELECT code, decision FROM decision_codes ORDER BY decision",
+    "SELECT id, label, start_date, end_date FROM weeks ORDER BY label",
+]
+LOOKUP_SQL = "SELECT app_number, decision, week, start_date, end_date FROM decisions WHERE lower(app_number) = ? ORDER BY end_date"
+
+
+def build_legacy(db_path, years, per_week):
+    conn = sqlite3.connect(db_path)
+    conn.execute(f"PRAGMA page_size = {decisions_schema.PAGE_SIZE}")
+    conn.execute(decisions_schema.LEGACY_TABLE_SQL)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_decisions_app_number_lower ON decisions(lower(app_number))")
+    for week, start_date, end_date, filename, rows in synthetic_weeks(52 * years, per_week):
+        conn.executemany("""
+            INSERT OR IGNORE INTO decisions (app_number, decision, week, start_date, end_date, filename)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, [(app_number, decision, week, start_date, end_date, filename) for app_number, decision in rows])
+    conn.commit()
+    conn.execute("VACUUM")
+    return conn
+
+
+def best_of(fn, repeat=3):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def time_queries(db_path, conn, lookups):
+    import dashboard
+
+    def pandas_stats():
+        dashboard.compute_stats(dashboard.load_decisions.__wrapped__(db_path))
+
+    compact = decisions_schema.schema_state(conn) == "compact"
+    aggregate_sql = weekly_summary.AGGREGATE_SQL if compact else LEGACY_AGGREGATE_SQL
+    load_sql = COMPACT_LOAD_SQL if compact else [LOAD_SQL]
+    return {
+        "load": best_of(lambda: [conn.execute(sql).fetchall() for sql in load_sql]),
+        "weekly aggregate": best_of(lambda: conn.execute(aggregate_sql).fetchall()),
+        f"lookup x{len(lookups)}": best_of(lambda: [conn.execute(LOOKUP_SQL, (n,)).fetchall() for n in lookups]),
+        "pandas": best_of(pandas_stats),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the legacy and compact decisions schemas")
+    parser.add_argument("--years", type=int, default=5, help="Years of weekly PDFs to generate")
+    parser.add_argument("--per-week", type=int, default=1000, help="Decisions per week")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_path = os.path.join(tmp, "legacy.db")
+        compact_path = os.path.join(tmp, "compact.db")
+        legacy = build_legacy(legacy_path, args.years, args.per_week)
+        count = legacy.execute("SELECT COUNT(*) FROM decisions").fetchone()[0]
+        lookups = [row[0] for row in legacy.execute("SELECT app_number FROM decisions ORDER BY random() LIMIT 1000")]
+
+        shutil.copy(legacy_path, compact_path)
+        compact = sqlite3.connect(compact_path)
+        started = time.perf_counter()
+        db.migrate(compact)  # VACUUMs after the compact-schema step
+        compact.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        migrate_time = time.perf_counter() - started
+
+        assert legacy.execute(LOAD_SQL + " ORDER BY rowid").fetchall() == compact.execute(LOAD_SQL + " ORDER BY id").fetchall()
+        print(f"{count:,} decisions over {args.years} year(s), migrated in {migrate_time:.2f}s\n")
+
+        legacy_size = os.path.getsize(legacy_path)
+        compact_size = os.path.getsize(compact_path)
+        print(f"{'':<22} {'legacy':>10} {'compact':>10} {'change':>8}")
+        print(f"{'file size (KiB)':<22} {legacy_size / 1024:10,.0f} {compact_size / 1024:10,.0f} "
+              f"{(compact_size / legacy_size - 1) * 100:+7.0f}%")
+
+        legacy_times = time_queries(legacy_path, legacy, lookups)
+        compact_times = time_queries(compact_path, compact, lookups)
+        for name, took in legacy_times.items():
+            print(f"{name + ' (ms)':<22} {took * 1000:10.1f} {compact_times[name] * 1000:10.1f} "
+                  f"{(compact_times[name] / took - 1) * 100:+7.0f}%")
+        legacy.close()
+        compact.close()
+
+
+if __name__ == "__main__":
+    main()
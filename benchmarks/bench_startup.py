@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Import time of the cron entry points, against a budget.
+Each entry point is imported in a fresh interpreter under -X importtime;
+the run fails (exit 1) if one goes over its budget or pulls in a heavy
+module it should only import once it has work to do:
+
+- main (data pipeline): requests/bs4 only in build_stages, pdfplumber only
+  when a PDF is parsed, pandas/matplotlib only when chart tiles are rendered
+- email_cli (the -c email): no streamlit, pandas or matplotlib when the
+  chart tile is already in the tile store
+
+The budgets are well above what these take on a laptop, so a failure means
+a heavy import crept back in, not a slow machine.
+
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --repeat 5
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PIPELINE_DIR = os.path.join(BASE_DIR, "..", "data_pipline")
+WEB_DIR = os.path.join(BASE_DIR, "..", "visa-dashboard-web")
+
+HEAVY = ("streamlit", "pandas", "numpy", "matplotlib", "altair", "pdfplumber", "requests", "bs4")
+
+# (module, directory it runs from, import budget in ms)
+ENTRY_POINTS = [
+    ("main", PIPELINE_DIR, 150),
+    ("processor", PIPELINE_DIR, 150),
+    ("email_cli", WEB_DIR, 100),
+]
+
+
+def import_profile(module, cwd):
+    """Run `import module` under -X importtime.
+
+    Returns (cumulative import time of module in ms, top-level packages
+    imported, wall time of the whole interpreter in ms).
+    """
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=cwd, capture_output=True, text=True,
+    )
+    wall = (time.perf_counter() - started) * 1000
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr}")
+
+    cumulative = None
+    packages = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cum, name = line.split("|")
+        if not cum.strip().isdigit():
+            continue  # the header line
+        name = name.strip()
+        packages.add(name.split(".")[0])
+        if name == module:
+            cumulative = int(cum) / 1000
+    return cumulative, packages, wall
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the import time of the cron entry points")
+    parser.add_argument("--repeat", type=int, default=3, help="Fresh interpreters per entry point (median is used)")
+    args = parser.parse_args()
+
+    failures = []
+    print(f"{'entry point':<12} {'import':>10} {'budget':>8} {'process':>10}  heavy modules")
+    for module, cwd, budget in ENTRY_POINTS:
+        runs = [import_profile(module, cwd) for _ in range(args.repeat)]
+        took = statistics.median(run[0] for run in runs)
+        wall = statistics.median(run[2] for run in runs)
+        heavy = sorted(set(HEAVY) & runs[0][1])
+        print(f"{module:<12} {took:7.1f} ms {budget:5} ms {wall:7.1f} ms  {', '.join(heavy) or '-'}")
+        if took > budget:
+            failures.append(f"{module} took {took:.1f} ms to import (budget {budget} ms)")
+        if heavy:
+            failures.append(f"{module} imports {', '.join(heavy)} at startup")
+
+    if failures:
+        print("\n" + "\n".join(failures))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark for stats.summarize against the groupby-based compute_stats and
+advanced_stats it replaced. Builds synthetic decision frames (about 1 in 8
+refused, spread over a week per 10,000 decisions, with a few untrimmed or
+upper-case decisions) and times the weekly summary plus trends:
+
+- groupby: the old compute_stats + advanced_stats, kept here as reference
+- summarize, text: stats.summarize on plain string columns
+- summarize, categorical: week and decision as categoricals, as
+  dashboard.load_decisions returns them
+
+Each result is checked against the reference.
+
+    python benchmarks/bench_stats.py                      # 10k, 1M and 10M decisions
+    python benchmarks/bench_stats.py -n 100000 -n 500000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BASE_DIR, "..", "visa-dashboard-web"))
+
+import stats  # noqa: E402
+from synthetic import synthetic_decisions  # noqa: E402
+
+
+# dashboard.py's weekly summary before stats.summarize
+def legacy_compute_stats(df):
+    df["decision"] = df["decision"].str.strip().str.capitalize()
+    summary = (
+        df.groupby("week")["decision"]
+        .value_counts()
+        .unstack(fill_value=0)
+        .reset_index()
+    )
+    summary["Total"] = summary.get("Approved", 0) + summary.get("Refused", 0)
+    summary["Refused %"] = (summary.get("Refused", 0) / summary["Total"] * 100).round(2)
+    summary["end_date"] = df.groupby("week")["end_date"].first().values
+    summary["start_date"] = df.groupby("week")["start_date"].first().values
+    summary = summary.sort_values("end_date").reset_index(drop=True)
+    return summary
+
+
+def legacy_advanced_stats(summary):
+    adv = summary.copy()
+    adv["Total_3wk_MA"] = adv["Total"].rolling(3, min_periods=1).mean()
+    adv["Total_pct_change"] = adv["Total"].pct_change().fillna(0) * 100
+    return adv
+
+
+def legacy_summary(df):
+    return legacy_advanced_stats(legacy_compute_stats(df))
+
+
+def time_call(fn, df, repeat):
+    """Best of repeat runs of fn on a fresh copy of df, and the last result."""
+    best = float("inf")
+    for _ in range(repeat):
+        frame = df.copy()
+        started = time.perf_counter()
+        result = fn(frame)
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def same(a, b):
+    a, b = a.copy(), b.copy()
+    a.columns.name = b.columns.name = None
+    pd.testing.assert_frame_equal(a, b, check_dtype=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the weekly summary aggregation")
+    parser.add_argument("-n", "--rows", type=int, action="append", help="Decisions to summarize (repeatable)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per size (best is reported)")
+    args = parser.parse_args()
+
+    print(f"{'decisions':>12} {'weeks':>6}  {'groupby':>10} {'summarize, text':>16} {'summarize, categorical':>23}  speed-up")
+    for n in args.rows or [10_000, 1_000_000, 10_000_000]:
+        text = synthetic_decisions(n)
+        categorical = text.astype({"week": "category", "decision": "category"})
+        repeat = args.repeat if n < 5_000_000 else 1
+
+        legacy, expected = time_call(legacy_summary, text, repeat)
+        on_text, result = time_call(stats.summarize, text, repeat)
+        same(expected, result)
+        on_categorical, result = time_call(stats.summarize, categorical, repeat)
+        same(expected, result)
+
+        print(f"{n:>12,} {len(expected):>6}  {legacy * 1000:>7.1f} ms {on_text * 1000:>13.1f} ms "
+              f"{on_categorical * 1000:>20.1f} ms  {legacy / on_text:4.1f}x / {legacy / on_categorical:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,425 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+End-to-end benchmark of the pipeline and dashboard on synthetic data.
+Generates weekly SAVD PDFs (see synthetic.py) and runs them through each
+stage in turn, as the cron jobs and the dashboard would:
+
+- generate: write the synthetic PDFs
+- process_pdf: processor.process_pdf on each PDF (pdfplumber)
+- insert_into_db: processor.insert_into_db per week into a fresh decisions.db
+- render_tiles: processor.render_chart_tiles, as after an ingest
+- load_data: dashboard.load_data with cold caches
+- compute_stats / advanced_stats: the weekly summary and its trends
+- render_chart: one chart window as a PNG (charts.render_png)
+- send_chart_email: send_email.send_chart_email to a local SMTP server,
+  so nothing leaves the machine
+
+Each stage's time, throughput and peak RSS go to a JSON results file. With
+a baseline (saved earlier with --save-baseline, on the same machine and
+sizes) any stage that got slower or bigger by more than --threshold is
+flagged and the run exits 1. A stage whose dependency is not installed is
+recorded as skipped.
+
+    python benchmarks/bench_suite.py                          # 26 weeks, 2,000 decisions a week
+    python benchmarks/bench_suite.py --weeks 260 --per-week 1000
+    python benchmarks/bench_suite.py --repeat 3 --save-baseline   # then compare later runs against it
+"""
+
+import argparse
+import contextlib
+import importlib.util
+import io
+import json
+import logging
+import os
+import platform
+import resource
+import smtplib
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BASE_DIR, "..", "data_pipline"))
+sys.path.insert(0, os.path.join(BASE_DIR, "..", "visa-dashboard-web"))
+
+import synthetic  # noqa: E402
+
+RESULTS_PATH = os.path.join(BASE_DIR, "results.json")
+BASELINE_PATH = os.path.join(BASE_DIR, "baseline.json")
+# Stages quicker than this (in the baseline and now) are too noisy to flag
+MIN_SECONDS = 0.05
+RSS_INTERVAL = 0.005
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+
+
+
+class Skipped(Exception):
+    """Raised by a stage that cannot run here; the message is the reason."""
+
+
+def require(module):
+    if importlib.util.find_spec(module) is None:
+        raise Skipped(f"{module} is not installed")
+
+
+# === peak RSS ===
+def current_rss():
+    """Resident set size in bytes, or None where /proc is not available."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except OSError:
+        return None
+
+
+class PeakRSS:
+    """Peak RSS while the with-block runs, sampled from a background thread.
+
+    Without /proc this falls back to ru_maxrss, the peak of the whole
+    process so far, which only shows a stage that raised the peak.
+    """
+
+    def __enter__(self):
+        self.peak = current_rss()
+        self.done = threading.Event()
+        if self.peak is not None:
+            self.thread = threading.Thread(target=self.sample, daemon=True)
+            self.thread.start()
+        return self
+
+    def sample(self):
+        while not self.done.wait(RSS_INTERVAL):
+            self.peak = max(self.peak, current_rss())
+
+    def __exit__(self, *exc):
+        self.done.set()
+        if self.peak is None:
+            # kilobytes on Linux, bytes on macOS
+            scale = 1 if sys.platform == "darwin" else 1024
+            self.peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+        else:
+            self.thread.join()
+            self.peak = max(self.peak, current_rss())
+
+
+# === local SMTP server ===
+class SMTPHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP for smtplib: EHLO, AUTH PLAIN, MAIL, RCPT, DATA, QUIT.
+    Every message is accepted and kept on the server as (recipients, bytes)."""
+
+    def reply(self, line):
+        self.wfile.write(line.encode("ascii") + b"\r\n")
+
+    def handle(self):
+        self.reply("220 localhost SMTP stand-in")
+        recipients = []
+        for line in self.rfile:
+            command = line.decode("ascii", "replace").strip().split(" ")[0].upper()
+            if command == "EHLO":
+                self.reply("250-localhost")
+                self.reply("250 AUTH PLAIN")
+            elif command == "AUTH":
+                self.reply("235 Authentication successful")
+            elif command in ("MAIL", "RSET"):
+                recipients = []
+                self.reply("250 OK")
+            elif command in ("HELO", "NOOP"):
+                self.reply("250 OK")
+            elif command == "RCPT":
+                recipients.append(line.decode("ascii").split(":", 1)[1].strip())
+                self.reply("250 OK")
+            elif command == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                size = 0
+                for data in self.rfile:
+                    if data == b".\r\n":
+                        break
+                    size += len(data)
+                self.server.messages.append((recipients, size))
+                self.reply("250 OK")
+            elif command == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+@contextlib.contextmanager
+def local_smtp():
+    """Run a local SMTP server and point send_email at it (no SSL, dummy
+    login) for the duration; yields the server."""
+    import send_email
+
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), SMTPHandler)
+    server.daemon_threads = True
+    server.messages = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    connect = send_email.smtp_connection
+    credentials = {key: os.environ.get(key) for key in ("USERNAME", "PASSWORD")}
+    send_email.smtp_connection = lambda: smtplib.SMTP(*server.server_address, local_hostname="localhost")
+    # set, not defaulted: load_dotenv never overrides these, so a real .env is not used
+    os.environ.update(USERNAME="bench", PASSWORD="bench")
+    try:
+        yield server
+    finally:
+        send_email.smtp_connection = connect
+        for key, value in credentials.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+        server.shutdown()
+        server.server_close()
+
+
+# === stages ===
+# Each stage takes the shared state dict, may add to it for later stages,
+# and returns (items processed, unit).
+def stage_generate(state):
+    state["pdfs"] = synthetic.write_pdfs(state["pdf_dir"], state["weeks"], state["per_week"], state["seed"])
+    return sum(len(rows) for *_, rows in state["pdfs"]), "rows"
+
+
+def stage_process_pdf(state):
+    require("pdfplumber")
+    import processor
+
+    extracted = {}
+    for path, week, _, _, filename, rows in state["pdfs"]:
+        got = processor.process_pdf(path, week, state["message_file"])
+        if got != rows:
+            raise AssertionError(f"{filename}: extracted rows differ from the rows written")
+        extracted[filename] = got
+    state["extracted"] = extracted
+    return sum(map(len, extracted.values())), "rows"
+
+
+def stage_insert_into_db(state):
+    import processor
+
+    conn = processor.init_db(state["db_path"])
+    inserted = 0
+    for _, week, start_date, end_date, filename, rows in state["pdfs"]:
+        rows = state.get("extracted", {}).get(filename, rows)
+        inserted += processor.insert_into_db(conn, rows, week, start_date, end_date, filename, state["message_file"])
+    expected = sum(len(rows) for *_, rows in state["pdfs"])
+    if inserted != expected:
+        raise AssertionError(f"inserted {inserted} rows, expected {expected}")
+    state["conn"] = conn
+    return inserted, "rows"
+
+
+def stage_render_tiles(state):
+    import processor
+
+    tiles = processor.render_chart_tiles(state["conn"])
+    if not tiles:
+        raise AssertionError("no chart tiles were rendered")
+    return tiles, "tiles"
+
+
+def stage_load_data(state):
+    import streamlit  # noqa: F401
+
+    # st.cache_data works without a Streamlit server but warns on every
+    # call; streamlit sets its loggers' levels on import, so this goes after
+    # it and before dashboard's cached functions are defined
+    for name in ("streamlit.runtime.caching.cache_data_api", "streamlit.runtime.scriptrunner_utils.script_run_context"):
+        logging.getLogger(name).setLevel(logging.ERROR)
+    import dashboard
+
+    dashboard.clear_caches()
+    state["df"], _ = dashboard.load_data(state["db_path"], state["message_file"])
+    return len(state["df"]), "rows"
+
+
+def stage_compute_stats(state):
+    import dashboard
+
+    state["summary"] = dashboard.compute_stats(state["df"])
+    return len(state["df"]), "rows"
+
+
+def stage_advanced_stats(state):
+    import dashboard
+
+    state["advanced"] = dashboard.advanced_stats(state["summary"])
+    return len(state["summary"]), "weeks"
+
+
+def stage_render_chart(state):
+    import charts
+
+    summary = state["summary"]
+    state["png"] = charts.render_png(summary, charts.default_start(len(summary)))
+    return 1, "charts"
+
+
+def stage_send_chart_email(state):
+    require("dotenv")
+    import send_email
+
+    server = state["smtp"]
+    received = len(server.messages)
+    send_email.send_chart_email(state["png"])
+    if len(server.messages) != received + 1:
+        raise AssertionError("the email did not reach the local SMTP server")
+    return 1, "emails"
+
+
+STAGES = [
+    ("generate", stage_generate),
+    ("process_pdf", stage_process_pdf),
+    ("insert_into_db", stage_insert_into_db),
+    ("render_tiles", stage_render_tiles),
+    ("load_data", stage_load_data),
+    ("compute_stats", stage_compute_stats),
+    ("advanced_stats", stage_advanced_stats),
+    ("render_chart", stage_render_chart),
+    ("send_chart_email", stage_send_chart_email),
+]
+
+
+def run_stage(fn, state):
+    """Run one stage with its output silenced; returns its result record."""
+    try:
+        with PeakRSS() as rss, contextlib.redirect_stdout(io.StringIO()):
+            started = time.perf_counter()
+            items, unit = fn(state)
+            seconds = time.perf_counter() - started
+    except Skipped as e:
+        return {"status": "skipped", "reason": str(e)}
+    return {
+        "status": "ok",
+        "seconds": round(seconds, 6),
+        "items": items,
+        "unit": unit,
+        "throughput": round(items / seconds, 2) if seconds else None,
+        "peak_rss_mb": round(rss.peak / 2**20, 1),
+    }
+
+
+def run_once(weeks, per_week, seed):
+    """Run every stage once, on fresh synthetic data in a temporary folder."""
+    with tempfile.TemporaryDirectory() as tmp, local_smtp() as smtp:
+        state = {
+            "weeks": weeks,
+            "per_week": per_week,
+            "seed": seed,
+            "pdf_dir": os.path.join(tmp, "pdf"),
+            "db_path": os.path.join(tmp, "decisions.db"),
+            "message_file": os.path.join(tmp, "message.txt"),
+            "smtp": smtp,
+        }
+        open(state["message_file"], "w").close()
+        results = {name: run_stage(fn, state) for name, fn in STAGES}
+        if "conn" in state:
+            state["conn"].close()
+    return results
+
+
+def run_suite(weeks, per_week, seed, repeat):
+    """Each stage's best time over repeat runs.
+
+    Peak RSS is the first run's: later runs start with whatever the earlier
+    ones left allocated (imports, caches).
+    """
+    results = run_once(weeks, per_week, seed)
+    for _ in range(repeat - 1):
+        for name, result in run_once(weeks, per_week, seed).items():
+            if result["status"] == "ok" and result["seconds"] < results[name]["seconds"]:
+                results[name].update(seconds=result["seconds"], throughput=result["throughput"])
+    return results
+
+
+# === results and baseline ===
+def print_stage(name, result):
+    if result["status"] != "ok":
+        print(f"{name:<18} skipped: {result['reason']}")
+        return
+    print(f"{name:<18} {result['seconds'] * 1000:10.1f} ms {result['items']:>10,} {result['unit']:<6} "
+          f"{result['throughput'] or 0:>14,.0f}/s {result['peak_rss_mb']:8.1f} MB")
+
+
+def compare(results, baseline, threshold):
+    """Lines describing each stage that regressed against baseline, or
+    None if the baseline was run with different settings."""
+    if baseline["config"] != results["config"]:
+        return None
+    regressions = []
+    for name, now in results["stages"].items():
+        before = baseline["stages"].get(name)
+        if now["status"] != "ok" or not before or before["status"] != "ok":
+            continue
+        slower = now["seconds"] / before["seconds"] - 1 if before["seconds"] else 0
+        if slower > threshold and max(now["seconds"], before["seconds"]) >= MIN_SECONDS:
+            regressions.append(f"{name}: {before['seconds'] * 1000:.1f} ms -> {now['seconds'] * 1000:.1f} ms "
+                               f"({slower * 100:+.0f}%)")
+        bigger = now["peak_rss_mb"] / before["peak_rss_mb"] - 1
+        if bigger > threshold:
+            regressions.append(f"{name}: peak RSS {before['peak_rss_mb']:.1f} MB -> {now['peak_rss_mb']:.1f} MB "
+                               f"({bigger * 100:+.0f}%)")
+    return regressions
+
+
+def write_json(path, data):
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2)
+        f.write("\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline and dashboard on synthetic data")
+    parser.add_argument("--weeks", type=int, default=26, help="Weekly PDFs to generate")
+    parser.add_argument("--per-week", type=int, default=2000, help="Decisions per week")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=1, help="Runs of the whole suite (best is kept per stage)")
+    parser.add_argument("--output", default=RESULTS_PATH, help="Where to write the results")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Results to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="Also save these results as the baseline")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="Flag stages this much slower or bigger than the baseline (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    config = {"weeks": args.weeks, "per_week": args.per_week, "seed": args.seed, "repeat": args.repeat}
+    print(f"{args.weeks * args.per_week:,} decisions over {args.weeks} week(s)\n")
+    results = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": config,
+        "stages": run_suite(args.weeks, args.per_week, args.seed, args.repeat),
+    }
+    for name, result in results["stages"].items():
+        print_stage(name, result)
+    write_json(args.output, results)
+    print(f"\nResults written to {args.output}")
+    if args.save_baseline:
+        write_json(args.baseline, results)
+        print(f"Baseline saved to {args.baseline}")
+        return
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one")
+        return
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.threshold)
+    if regressions is None:
+        print(f"Baseline was run with {baseline['config']}, not {results['config']}; not compared")
+    elif regressions:
+        print(f"\nRegressions against {args.baseline}:\n" + "\n".join(regressions))
+        sys.exit(1)
+    else:
+        print(f"No regressions against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
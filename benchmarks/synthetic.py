@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Synthetic SAVD data for the benchmarks: decision rows, weeks of decisions,
+decision frames shaped like dashboard.load_decisions returns them, the
+weekly decision PDFs the scraper downloads, and decisions.db files built
+from them.
+
+The PDFs are written by hand (no PDF library needed): each page has a
+title, an "Application Number" | "Decision" header and a ruled two-column
+grid, so both extraction engines in data_pipline/extractors.py read them
+the way they read the real ones.
+
+    python benchmarks/synthetic.py pdfs out/ --weeks 4 --per-week 2000
+    python benchmarks/synthetic.py db out/decisions.db --weeks 260 --per-week 1000
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+from datetime import date, timedelta
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BASE_DIR, "..", "data_pipline"))
+
+LAST_WEEK_START = date(2025, 6, 17)
+# (week, start_date, end_date, filename) of the week single-batch benchmarks load
+WEEK = ("17 Jun to 23 Jun 2025", "2025-06-17", "2025-06-23", "SAVD-Decisions-17-June-to-23-June-2025.pdf")
+
+# A4 in points, and the grid the decisions are drawn in
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842
+ROWS_PER_PAGE = 40
+ROW_HEIGHT = 18
+COLUMNS = (60, 300, 535)  # left edge, column boundary, right edge
+TABLE_TOP = 790
+FONT_SIZE = 10
+
+
+def week_filename(start, end):
+    return f"SAVD-Decisions-{start.day}-{start.strftime('%B')}-to-{end.day}-{end.strftime('%B')}-{end.year}.pdf"
+
+
+def random_rows(rnd, n):
+    numbers = rnd.sample(range(70_000_000, 80_000_000), n)
+    return [[str(num), "Refused" if rnd.random() < 0.125 else "Approved"] for num in numbers]
+
+
+def synthetic_rows(n, seed=0):
+    """n unique [app_number, decision] rows, roughly 1 in 8 refused."""
+    return random_rows(random.Random(seed), n)
+
+
+def synthetic_weeks(weeks, per_week, seed=0, last_start=LAST_WEEK_START):
+    """Yield (week, start_date, end_date, filename, rows) for consecutive
+    weekly PDFs ending with the week starting last_start; rows are
+    per_week unique [app_number, decision] pairs, roughly 1 in 8 refused."""
+    rnd = random.Random(seed)
+    start = last_start - timedelta(weeks=weeks)
+    for _ in range(weeks):
+        start += timedelta(weeks=1)
+        end = start + timedelta(days=6)
+        week = f"{start.strftime('%d %b')} to {end.strftime('%d %b %Y')}"
+        yield week, start.isoformat(), end.isoformat(), week_filename(start, end), random_rows(rnd, per_week)
+
+
+def synthetic_decisions(n, seed=0):
+    """n decisions over one week per 10,000, as load_decisions shapes them,
+    with a few untrimmed or upper-case decisions."""
+    import numpy as np
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    n_weeks = max(1, n // 10_000)
+    starts = pd.date_range(end=LAST_WEEK_START.isoformat(), periods=n_weeks, freq="7D")
+    labels = np.array([f"{s:%d %b} to {s + pd.Timedelta(days=6):%d %b %Y}" for s in starts], dtype=object)
+    decisions = np.array(["Approved", "Refused", "approved ", "REFUSED"], dtype=object)
+
+    week = rng.integers(0, n_weeks, n)
+    decision = rng.choice(4, n, p=[0.87, 0.12, 0.005, 0.005])
+    return pd.DataFrame({
+        "application_number": (70_000_000 + rng.permutation(n)).astype(str),
+        "decision": decisions[decision],
+        "week": labels[week],
+        "start_date": starts[week],
+        "end_date": starts[week] + pd.Timedelta(days=6),
+    })
+
+
+# === PDF writer ===
+def pdf_text(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def page_content(title, rows, page_number, page_count):
+    """Content stream of one page: title, ruled grid, header and rows."""
+    left, middle, right = COLUMNS
+    bottom = TABLE_TOP - ROW_HEIGHT * (len(rows) + 1)
+    ops = ["0.5 w"]
+    for y in range(TABLE_TOP, bottom - 1, -ROW_HEIGHT):
+        ops.append(f"{left} {y} m {right} {y} l S")
+    for x in COLUMNS:
+        ops.append(f"{x} {TABLE_TOP} m {x} {bottom} l S")
+
+    def text(x, y, value):
+        ops.append(f"BT /F1 {FONT_SIZE} Tf {x} {y} Td ({pdf_text(value)}) Tj ET")
+
+    text(left, TABLE_TOP + 25, title)
+    baseline = TABLE_TOP - ROW_HEIGHT + 5
+    for app_number, decision in [("Application Number", "Decision")] + rows:
+        text(left + 5, baseline, app_number)
+        text(middle + 5, baseline, decision)
+        baseline -= ROW_HEIGHT
+    text(left, 25, f"Page {page_number} of {page_count}")
+    return "\n".join(ops).encode("latin-1")
+
+
+def write_pdf(path, title, rows, rows_per_page=ROWS_PER_PAGE):
+    """Write rows as a SAVD-style decisions PDF; returns the page count.
+
+    Objects are written as they are generated (pages first, the page tree
+    last), so memory does not grow with the number of pages.
+    """
+    pages = [rows[i:i + rows_per_page] for i in range(0, len(rows), rows_per_page)] or [[]]
+    offsets = {}
+    with open(path, "wb") as f:
+        def obj(number, body):
+            offsets[number] = f.tell()
+            f.write(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+
+        f.write(b"%PDF-1.4\n")
+        obj(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+        obj(3, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+        kids = []
+        for index, page_rows in enumerate(pages):
+            page, content = 4 + 2 * index, 5 + 2 * index
+            stream = page_content(title, page_rows, index + 1, len(pages))
+            obj(content, b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+            obj(page, b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] "
+                      b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>"
+                % (PAGE_WIDTH, PAGE_HEIGHT, content))
+            kids.append(b"%d 0 R" % page)
+        obj(2, b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(kids), len(kids)))
+
+        xref = f.tell()
+        count = max(offsets) + 1
+        f.write(b"xref\n0 %d\n0000000000 65535 f \n" % count)
+        for number in range(1, count):
+            f.write(b"%010d 00000 n \n" % offsets[number])
+        f.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (count, xref))
+    return len(pages)
+
+
+def write_pdfs(folder, weeks, per_week, seed=0):
+    """Write a weekly PDF per synthetic week into folder.
+
+    Returns [(path, week, start_date, end_date, filename, rows)], so callers
+    can check what was extracted against what was written.
+    """
+    os.makedirs(folder, exist_ok=True)
+    written = []
+    for week, start_date, end_date, filename, rows in synthetic_weeks(weeks, per_week, seed):
+        path = os.path.join(folder, filename)
+        write_pdf(path, f"Visa Decisions {week}", rows)
+        written.append((path, week, start_date, end_date, filename, rows))
+    return written
+
+
+# === decisions.db ===
+def build_db(db_path, weeks, per_week, seed=0, tiles=False):
+    """Build a decisions.db at db_path the way the processor does (all
+    migrations, bulk inserts, weekly_summary kept by its triggers) and
+    return the connection. With tiles, chart tiles are also rendered into
+    chart_tiles.db next to it."""
+    import processor
+
+    conn = processor.init_db(db_path)
+    for week, start_date, end_date, filename, rows in synthetic_weeks(weeks, per_week, seed):
+        processor.insert_rows(conn, rows, week, start_date, end_date, filename)
+        conn.commit()
+    if tiles:
+        with contextlib.redirect_stdout(io.StringIO()):
+            processor.render_chart_tiles(conn)
+    return conn
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic SAVD PDFs or a synthetic decisions.db")
+    parser.add_argument("kind", choices=["pdfs", "db"], help="What to generate")
+    parser.add_argument("path", help="Folder for the PDFs, or the decisions.db to create")
+    parser.add_argument("--weeks", type=int, default=52, help="Weeks of decisions")
+    parser.add_argument("--per-week", type=int, default=1000, help="Decisions per week")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--tiles", action="store_true", help="Also render chart tiles into chart_tiles.db next to the db")
+    args = parser.parse_args()
+
+    if args.kind == "pdfs":
+        written = write_pdfs(args.path, args.weeks, args.per_week, args.seed)
+        print(f"Wrote {len(written)} PDF(s) to {args.path}")
+        return
+    if os.path.exists(args.path):
+        parser.error(f"{args.path} already exists")
+    build_db(args.path, args.weeks, args.per_week, args.seed, args.tiles).close()
+    print(f"Wrote {args.weeks * args.per_week:,} decisions to {args.path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,32 @@
 import argparse
-import sqlite3
 import os
+import sqlite3
+from collections import namedtuple
 from datetime import datetime, timezone, timedelta
 import sys
+import urllib.parse
+
+import web_path  # db_conn lives in visa-dashboard-web
+import db_conn
 
 # ---- Database path (canonical) ----
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DB_PATH = os.path.join(BASE_DIR, "..", "visa-dashboard-web", "decisions.db")
+WEB_DIR = web_path.WEB_DIR
+DB_PATH = os.path.join(WEB_DIR, "decisions.db")
+
+import logging
+logger = logging.getLogger(__name__)
 
 # ---- DB helpers ----
 
 def connect():
-    return sqlite3.connect(DB_PATH)
+    """This thread's shared connection to decisions.db (see db_conn)."""
+    return db_conn.connect(DB_PATH)
+
+def connect_readonly():
+    """A read-only connection to decisions.db that leaves the file as it is
+    (connect() switches it to WAL)."""
+    return sqlite3.connect(f"file:{urllib.parse.quote(DB_PATH)}?mode=ro", uri=True)
 
 def list_settings():
     with connect() as conn:
@@ -76,6 +91,352 @@ def get_scraped_files():
         ).fetchall()
     return rows
 
+def add_scraped_file(filename, url):
+    with connect() as conn:
+        conn.execute("""
+            INSERT INTO scraped_files (filename, url, date_added)
+            VALUES (?, ?, ?)
+            ON CONFLICT(filename) DO UPDATE SET url=excluded.url, date_added=excluded.date_added
+        """, (filename, url, datetime.now(timezone.utc).isoformat(timespec="seconds")))
+
+# ---- Schema migrations ----
+# decisions.db is built up by numbered steps. migrate() runs the ones a file
+# has not had yet, in order, each in its own transaction together with its
+# row in schema_version, so any copy of the DB (the shipped one, a backup,
+# a new file) is brought up to date at pipeline start. Every step is
+# idempotent (IF NOT EXISTS), so on a file made before schema_version it
+# just records itself. Add new steps at the end; never renumber or change
+# one that has shipped. Each step's SQL is written out here in full rather
+# than taken from the modules that use the tables, so editing those modules
+# never changes a step that has already run somewhere.
+# vacuum: VACUUM once the steps are done (the step frees a lot of space)
+Migration = namedtuple("Migration", ["version", "name", "apply", "vacuum"])
+
+
+def create_settings_tables(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS settings (
+            setting TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS scraped_files (
+            filename TEXT PRIMARY KEY,
+            url TEXT,
+            date_added TEXT
+        )
+    """)
+
+
+def create_ingest_tables(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS ingest_checkpoints (
+            filename TEXT PRIMARY KEY,
+            last_page INTEGER NOT NULL,
+            rows_extracted INTEGER NOT NULL,
+            rows_inserted INTEGER NOT NULL,
+            updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS file_ledger (
+            sha256 TEXT PRIMARY KEY,
+            filename TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            row_count INTEGER NOT NULL,
+            rows_inserted INTEGER NOT NULL,
+            date_added TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_file_ledger_filename ON file_ledger(filename)")
+
+
+def create_compact_decisions(conn):
+    """The compact decisions schema (see decisions_schema). A legacy
+    decisions table is copied into it, checked and dropped; if the counts
+    differ the step fails and the old table is left as it is."""
+    legacy = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'decisions'"
+    ).fetchone() is not None
+
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS decision_codes (
+            code INTEGER PRIMARY KEY,
+            decision TEXT NOT NULL UNIQUE
+        )
+    """)
+    conn.execute("INSERT OR IGNORE INTO decision_codes (code, decision) VALUES (1, 'Approved'), (2, 'Refused')")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS weeks (
+            id INTEGER PRIMARY KEY,
+            label TEXT NOT NULL UNIQUE,
+            start_date INTEGER NOT NULL,
+            end_date INTEGER NOT NULL
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS files (
+            id INTEGER PRIMARY KEY,
+            filename TEXT NOT NULL UNIQUE
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS decision_rows (
+            id INTEGER PRIMARY KEY,
+            app_number TEXT NOT NULL,
+            decision INTEGER NOT NULL REFERENCES decision_codes(code),
+            week_id INTEGER NOT NULL REFERENCES weeks(id),
+            file_id INTEGER NOT NULL REFERENCES files(id),
+            date_added INTEGER NOT NULL DEFAULT (CAST(strftime('%s', 'now') AS INTEGER)),
+            UNIQUE(app_number, week_id)
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_decision_rows_app_number_lower ON decision_rows(lower(app_number))")
+
+    if legacy:
+        expected = conn.execute("SELECT COUNT(*) FROM decisions").fetchone()[0]
+        conn.execute("""
+            INSERT INTO decision_codes (decision)
+            SELECT DISTINCT decision FROM decisions
+            WHERE decision NOT IN (SELECT decision FROM decision_codes)
+            ORDER BY decision
+        """)
+        conn.execute("""
+            INSERT INTO weeks (label, start_date, end_date)
+            SELECT week, CAST(replace(MIN(start_date), '-', '') AS INTEGER), CAST(replace(MIN(end_date), '-', '') AS INTEGER)
+            FROM decisions
+            GROUP BY week
+            ORDER BY MIN(end_date), week
+        """)
+        conn.execute("""
+            INSERT INTO files (filename)
+            SELECT filename FROM decisions GROUP BY filename ORDER BY MIN(id)
+        """)
+        moved = conn.execute("""
+            INSERT INTO decision_rows (id, app_number, decision, week_id, file_id, date_added)
+            SELECT d.id, d.app_number, c.code, w.id, f.id,
+                   coalesce(CAST(strftime('%s', d.date_added) AS INTEGER), CAST(strftime('%s', 'now') AS INTEGER))
+            FROM decisions d
+            JOIN decision_codes c ON c.decision = d.decision
+            JOIN weeks w ON w.label = d.week
+            JOIN files f ON f.filename = d.filename
+            ORDER BY d.id
+        """).rowcount
+        if moved != expected:
+            raise RuntimeError(f"Copied {moved} of {expected} decisions, leaving the table as it is")
+        conn.execute("DROP TABLE decisions")
+        logger.info(f"Moved {moved} decisions to the compact schema")
+
+    conn.execute("""
+        CREATE VIEW IF NOT EXISTS decisions AS
+        SELECT r.id, r.app_number, c.decision, w.label AS week,
+               printf('%04d-%02d-%02d', w.start_date / 10000, w.start_date / 100 % 100, w.start_date % 100) AS start_date,
+               printf('%04d-%02d-%02d', w.end_date / 10000, w.end_date / 100 % 100, w.end_date % 100) AS end_date,
+               f.filename, datetime(r.date_added, 'unixepoch') AS date_added
+        FROM decision_rows r
+        JOIN decision_codes c ON c.code = r.decision
+        JOIN weeks w ON w.id = r.week_id
+        JOIN files f ON f.id = r.file_id
+    """)
+    # NOT EXISTS rather than OR IGNORE, since an INSERT OR REPLACE on the view
+    # would turn the inner inserts into replaces and renumber codes and ids
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS decisions_insert INSTEAD OF INSERT ON decisions
+        BEGIN
+            INSERT INTO decision_codes (decision)
+            SELECT NEW.decision WHERE NOT EXISTS (SELECT 1 FROM decision_codes WHERE decision = NEW.decision);
+            INSERT INTO weeks (label, start_date, end_date)
+            SELECT NEW.week, CAST(replace(NEW.start_date, '-', '') AS INTEGER), CAST(replace(NEW.end_date, '-', '') AS INTEGER)
+            WHERE NOT EXISTS (SELECT 1 FROM weeks WHERE label = NEW.week);
+            INSERT INTO files (filename)
+            SELECT NEW.filename WHERE NOT EXISTS (SELECT 1 FROM files WHERE filename = NEW.filename);
+            INSERT INTO decision_rows (app_number, decision, week_id, file_id, date_added)
+            VALUES (
+                NEW.app_number,
+                (SELECT code FROM decision_codes WHERE decision = NEW.decision),
+                (SELECT id FROM weeks WHERE label = NEW.week),
+                (SELECT id FROM files WHERE filename = NEW.filename),
+                coalesce(CAST(strftime('%s', NEW.date_added) AS INTEGER), CAST(strftime('%s', 'now') AS INTEGER))
+            );
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS decisions_delete INSTEAD OF DELETE ON decisions
+        BEGIN
+            DELETE FROM decision_rows WHERE id = OLD.id;
+        END
+    """)
+
+
+def create_weekly_summary(conn):
+    """weekly_summary and the triggers on decision_rows that keep it up to
+    date (see weekly_summary), filled from decision_rows if it is new."""
+    created = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'weekly_summary'"
+    ).fetchone() is None
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS weekly_summary (
+            week TEXT PRIMARY KEY,
+            start_date TEXT NOT NULL,
+            end_date TEXT NOT NULL,
+            approved INTEGER NOT NULL DEFAULT 0,
+            refused INTEGER NOT NULL DEFAULT 0,
+            total INTEGER NOT NULL DEFAULT 0,
+            decisions INTEGER NOT NULL DEFAULT 0,
+            refused_pct REAL
+        )
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS weekly_summary_insert AFTER INSERT ON decision_rows
+        BEGIN
+            INSERT INTO weekly_summary (week, start_date, end_date, approved, refused, total, decisions, refused_pct)
+            SELECT w.label,
+                   printf('%04d-%02d-%02d', w.start_date / 10000, w.start_date / 100 % 100, w.start_date % 100),
+                   printf('%04d-%02d-%02d', w.end_date / 10000, w.end_date / 100 % 100, w.end_date % 100),
+                   c.d = 'approved',
+                   c.d = 'refused',
+                   c.d IN ('approved', 'refused'),
+                   1,
+                   CASE c.d WHEN 'approved' THEN 0.0 WHEN 'refused' THEN 100.0 END
+            FROM weeks w, (SELECT lower(trim(decision)) AS d FROM decision_codes WHERE code = NEW.decision) c
+            WHERE w.id = NEW.week_id
+            ON CONFLICT(week) DO UPDATE SET
+                approved = approved + excluded.approved,
+                refused = refused + excluded.refused,
+                total = total + excluded.total,
+                decisions = decisions + 1,
+                refused_pct = ROUND(100.0 * (refused + excluded.refused) / NULLIF(total + excluded.total, 0), 2);
+        END
+    """)
+    # triggers cannot use CTEs, so the deleted row's decision and week are subqueries
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS weekly_summary_delete AFTER DELETE ON decision_rows
+        BEGIN
+            UPDATE weekly_summary SET
+                approved = approved - ((SELECT lower(trim(decision)) FROM decision_codes WHERE code = OLD.decision) = 'approved'),
+                refused = refused - ((SELECT lower(trim(decision)) FROM decision_codes WHERE code = OLD.decision) = 'refused'),
+                total = total - ((SELECT lower(trim(decision)) FROM decision_codes WHERE code = OLD.decision) IN ('approved', 'refused')),
+                decisions = decisions - 1,
+                refused_pct = ROUND(
+                    100.0 * (refused - ((SELECT lower(trim(decision)) FROM decision_codes WHERE code = OLD.decision) = 'refused'))
+                    / NULLIF(total - ((SELECT lower(trim(decision)) FROM decision_codes WHERE code = OLD.decision) IN ('approved', 'refused')), 0), 2)
+            WHERE week = (SELECT label FROM weeks WHERE id = OLD.week_id);
+            DELETE FROM weekly_summary WHERE week = (SELECT label FROM weeks WHERE id = OLD.week_id) AND decisions = 0;
+        END
+    """)
+    if created:
+        conn.execute("""
+            INSERT INTO weekly_summary (week, start_date, end_date, approved, refused, total, decisions, refused_pct)
+            SELECT w.label,
+                   printf('%04d-%02d-%02d', w.start_date / 10000, w.start_date / 100 % 100, w.start_date % 100),
+                   printf('%04d-%02d-%02d', w.end_date / 10000, w.end_date / 100 % 100, w.end_date % 100),
+                   SUM(n * (c.d = 'approved')), SUM(n * (c.d = 'refused')), SUM(n * (c.d IN ('approved', 'refused'))),
+                   SUM(n),
+                   ROUND(100.0 * SUM(n * (c.d = 'refused')) / NULLIF(SUM(n * (c.d IN ('approved', 'refused'))), 0), 2)
+            FROM (SELECT week_id, decision, COUNT(*) AS n FROM decision_rows GROUP BY week_id, decision) r
+            JOIN weeks w ON w.id = r.week_id
+            JOIN (SELECT code, lower(trim(decision)) AS d FROM decision_codes) c ON c.code = r.decision
+            GROUP BY w.id
+        """)
+
+
+def create_metrics_tables(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS pipeline_runs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            entry_point TEXT NOT NULL,
+            started_at TEXT NOT NULL,
+            finished_at TEXT,
+            status TEXT
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS pipeline_metrics (
+            run_id INTEGER NOT NULL REFERENCES pipeline_runs(id),
+            name TEXT NOT NULL,
+            stage TEXT NOT NULL DEFAULT '',
+            value REAL NOT NULL,
+            PRIMARY KEY (run_id, name, stage)
+        )
+    """)
+
+
+MIGRATIONS = [
+    Migration(1, "settings and scraped_files", create_settings_tables, False),
+    Migration(2, "ingest_checkpoints and file_ledger", create_ingest_tables, False),
+    Migration(3, "compact decisions schema", create_compact_decisions, True),
+    Migration(4, "weekly_summary and its triggers", create_weekly_summary, False),
+    Migration(5, "pipeline_runs and pipeline_metrics", create_metrics_tables, False),
+]
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+def init_schema_version(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TEXT NOT NULL
+        )
+    """)
+    conn.commit()
+
+
+def applied_versions(conn):
+    """{version: applied_at} for the steps conn's database has had."""
+    try:
+        return dict(conn.execute("SELECT version, applied_at FROM schema_version"))
+    except sqlite3.OperationalError:
+        return {}  # never migrated
+
+
+def migrate(conn):
+    """Apply every pending migration to conn's database; returns their versions.
+
+    An up-to-date database costs one read of schema_version. Each step takes the write lock first
+    (BEGIN IMMEDIATE) and rechecks schema_version, so two runs starting at
+    once cannot both apply it.
+    """
+    conn.commit()
+    init_schema_version(conn)
+    done = applied_versions(conn)
+    pending = [step for step in MIGRATIONS if step.version not in done]
+
+    applied = []
+    for step in pending:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if step.version in applied_versions(conn):
+                conn.rollback()
+                continue
+            step.apply(conn)
+            conn.execute(
+                "INSERT INTO schema_version (version, name, applied_at) VALUES (?, ?, ?)",
+                (step.version, step.name, datetime.now(timezone.utc).isoformat(timespec="seconds"))
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            logger.exception(f"Migration {step.version} ({step.name}) failed")
+            raise
+        logger.info(f"Applied migration {step.version}: {step.name}")
+        applied.append(step)
+
+    if any(step.vacuum for step in applied):
+        import decisions_schema
+        decisions_schema.compact(conn)
+    return [step.version for step in applied]
+
+
+def print_status(conn):
+    done = applied_versions(conn)
+    for step in MIGRATIONS:
+        print(f"{step.version:3}  {done.get(step.version, 'pending'):<25}  {step.name}")
+    pending = sum(step.version not in done for step in MIGRATIONS)
+    print(f"schema version {max(done, default=0)} of {LATEST_VERSION}, {pending} pending")
+
+
 # ---- CLI ----
 
 def main():
@@ -124,6 +485,18 @@ def main():
         help="Delete all rows from settings (requires confirmation)"
     )
 
+    group.add_argument(
+        "--migrate",
+        action="store_true",
+        help="Apply any pending schema migrations"
+    )
+
+    group.add_argument(
+        "--status",
+        action="store_true",
+        help="List schema migrations and whether each has been applied"
+    )
+
     args = parser.parse_args()
 
     if args.list:
@@ -153,6 +526,14 @@ def main():
     elif args.reset:
         reset_settings()
 
+    elif args.migrate:
+        applied = migrate(connect())
+        print(f"Applied migrations {applied}" if applied else "Schema already up to date")
+        print_status(connect())
+
+    elif args.status:
+        print_status(connect_readonly())
+
 if __name__ == "__main__":
     main()
 
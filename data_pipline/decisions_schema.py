@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+The compact decisions schema (created by db.py's migration 3) and the
+helpers that write to it.
+decisions used to repeat the decision string, the week label, both dates
+and the PDF filename as TEXT on every row. Each of those now lives once in
+a small table that the rows point at by integer id:
+
+    decision_codes  code -> decision ("Approved", "Refused", ...)
+    weeks           id -> label, start_date, end_date (dates as YYYYMMDD ints)
+    files           id -> filename
+    decision_rows   app_number, decision code, week_id, file_id,
+                    date_added (unix time)
+
+decisions is now a view with the old columns and values, so the
+application lookup and ad hoc queries are unchanged. The dashboard's
+load_decisions does not use it: it reads decision_rows, decision_codes and
+weeks as integers and turns the codes and YYYYMMDD dates into values in
+pandas, which is much faster than formatting every row through the view.
+Inserts and deletes through the view are routed to decision_rows by
+INSTEAD OF triggers, but the pipeline writes decision_rows directly: SQLite
+does not count rows changed through a view, and insert_rows reports that
+count.
+
+    python decisions_schema.py --status     # which schema decisions.db has
+    python decisions_schema.py --migrate    # convert it (python db.py --migrate does too)
+"""
+
+import argparse
+import os
+import sqlite3
+from datetime import date
+
+import web_path  # noqa: F401  (db_conn lives in visa-dashboard-web)
+import db
+import db_conn
+
+import logging
+logger = logging.getLogger(__name__)
+
+# The table the pipeline created before this schema, for building
+# old-style databases in benchmarks
+LEGACY_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS decisions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        app_number TEXT NOT NULL,
+        decision TEXT NOT NULL,
+        week TEXT NOT NULL,
+        start_date TEXT NOT NULL,
+        end_date TEXT NOT NULL,
+        filename TEXT NOT NULL,
+        date_added TEXT DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE(app_number, week)
+    )
+"""
+
+# 4 KiB, SQLite's default; see compact()
+PAGE_SIZE = 4096
+
+
+def iso_date_sql(column):
+    """SQL rendering a YYYYMMDD int column back as 'YYYY-MM-DD'."""
+    return f"printf('%04d-%02d-%02d', {column} / 10000, {column} / 100 % 100, {column} % 100)"
+
+
+def date_int(value):
+    """YYYYMMDD int for a date or 'YYYY-MM-DD' string, None if it is neither."""
+    if isinstance(value, date):
+        return value.year * 10000 + value.month * 100 + value.day
+    try:
+        return date_int(date.fromisoformat(value))
+    except (TypeError, ValueError):
+        return None
+
+
+# === SCHEMA ===
+def schema_state(conn):
+    """"compact", "legacy" (decisions is a table) or "missing"."""
+    row = conn.execute("SELECT type FROM sqlite_master WHERE name = 'decisions'").fetchone()
+    if row is None:
+        return "missing"
+    return "compact" if row[0] == "view" else "legacy"
+
+
+def compact(conn):
+    """Commit, then VACUUM so the space freed by the migration is given back.
+
+    The file is rebuilt with PAGE_SIZE pages on the way: the shipped
+    decisions.db uses 64 KiB pages, so every small table and index (weeks,
+    files, settings, ...) took at least 64 KiB on its own. The page size
+    can only change outside WAL, which needs the only open connection; if
+    another one holds the file, it is vacuumed as it is.
+    """
+    conn.commit()
+    try:
+        conn.execute("PRAGMA journal_mode = DELETE")
+        conn.execute(f"PRAGMA page_size = {PAGE_SIZE}")
+    except sqlite3.OperationalError as e:
+        logger.warning(f"Keeping the page size, the database is in use: {e}")
+    conn.execute("VACUUM")
+    conn.execute("PRAGMA journal_mode = WAL")
+
+
+# === WRITES ===
+# All three raise ValueError for a value their NOT NULL columns would
+# reject, which INSERT OR IGNORE would otherwise skip without a word
+def week_id(conn, label, start_date, end_date):
+    """Id of the week labelled label, adding it if it is new."""
+    start, end = date_int(start_date), date_int(end_date)
+    if not label or start is None or end is None:
+        raise ValueError(f"Not a valid week: {label!r} from {start_date!r} to {end_date!r}")
+    conn.execute("INSERT OR IGNORE INTO weeks (label, start_date, end_date) VALUES (?, ?, ?)", (label, start, end))
+    return conn.execute("SELECT id FROM weeks WHERE label = ?", (label,)).fetchone()[0]
+
+
+def file_id(conn, filename):
+    """Id of filename in files, adding it if it is new."""
+    if not filename:
+        raise ValueError(f"Not a valid filename: {filename!r}")
+    conn.execute("INSERT OR IGNORE INTO files (filename) VALUES (?)", (filename,))
+    return conn.execute("SELECT id FROM files WHERE filename = ?", (filename,)).fetchone()[0]
+
+
+def decision_code(conn, decision):
+    """Code of decision, adding it if it is new."""
+    if not decision:
+        raise ValueError(f"Not a valid decision: {decision!r}")
+    conn.execute("INSERT OR IGNORE INTO decision_codes (decision) VALUES (?)", (decision,))
+    return conn.execute("SELECT code FROM decision_codes WHERE decision = ?", (decision,)).fetchone()[0]
+
+
+# === CLI ===
+def report(conn, db_path):
+    state = schema_state(conn)
+    size = os.path.getsize(db_path) if os.path.exists(db_path) else 0
+    print(f"{os.path.basename(db_path)}: {state} schema, {size / 1024:,.0f} KiB")
+    if state != "missing":
+        count = conn.execute("SELECT COUNT(*) FROM decisions").fetchone()[0]
+        print(f"  {count:,} decisions")
+    if state == "compact":
+        for table in ("decision_codes", "weeks", "files"):
+            count = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            print(f"  {count:,} {table}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check or migrate the decisions schema")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--status", action="store_true", help="Show which schema decisions.db has")
+    group.add_argument("--migrate", action="store_true", help="Move decisions to the compact schema and VACUUM")
+    args = parser.parse_args()
+
+    if args.status:
+        report(db.connect_readonly(), db.DB_PATH)
+        return
+    conn = db.connect()
+    # the compact schema is one of db.py's migrations; running them all
+    # also creates weekly_summary's triggers and VACUUMs
+    db.migrate(conn)
+    # fold the WAL back in, so the size printed is the file's real size
+    db_conn.checkpoint(db.DB_PATH)
+    report(conn, db.DB_PATH)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,13 +7,23 @@ downloads them, and saves them to a specified directory.
 """
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin
+from concurrent.futures import ThreadPoolExecutor
 import os
+import re
+
+import http_cache
 
 import logging
 logger = logging.getLogger(__name__)
 
+# Concurrent PDF downloads (and pooled connections per host)
+DOWNLOAD_WORKERS = 4
+USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36"
+
 
 # === wrapping: moved config and path logic into a setup function
 def setup():
@@ -23,13 +33,22 @@ def setup():
     return BASE_URL, TO_PROCESS_DIR
 # === end wrapping
 
-def fetch_pdf_links(base_url):
-    """Fetch all SAVD PDF links from the visa desk page."""
+def make_session(pool_size=DOWNLOAD_WORKERS):
+    """requests Session with a connection pool big enough for pool_size threads."""
+    session = requests.Session()
+    session.headers["User-Agent"] = USER_AGENT
+    retries = Retry(total=3, backoff_factor=1, status_forcelist=[429, 500, 502, 503, 504])
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retries)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+def fetch_pdf_links(base_url, offline=None, session=None):
+    """Fetch all SAVD PDF links from the visa desk page (through the HTTP cache)."""
     headers = {
-        "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36"
+        "User-Agent": USER_AGENT
     }
-    response = requests.get(base_url, headers=headers)
-    response.raise_for_status()
+    response = http_cache.fetch(base_url, headers=headers, offline=offline, session=session)
     soup = BeautifulSoup(response.text, "html.parser")
     links = soup.find_all("a", href=True)
 
@@ -40,40 +59,100 @@ def fetch_pdf_links(base_url):
     ]
     return pdf_links
 
-def download_pdf(url, folder):
+def expected_size(response, offset):
+    """Full file size from Content-Range (206) or Content-Length (200), or None."""
+    if response.status_code == 206:
+        match = re.match(r"bytes \d+-\d+/(\d+)", response.headers.get("Content-Range", ""))
+        return int(match.group(1)) if match else None
+    length = response.headers.get("Content-Length")
+    return int(length) if length is not None else None
+
+def download_pdf(url, folder, session=None):
+    """Download url into folder and return the number of bytes fetched.
+
+    The body goes to <name>.part and is only renamed to <name> once its size
+    matches the server's Content-Length, so a file under its final name is
+    always complete. An existing .part file is resumed with a Range request.
+    """
     filename = os.path.basename(url)
     filepath = os.path.join(folder, filename)
+    part_path = filepath + ".part"
 
     if os.path.exists(filepath):
         print(f"Already downloaded: {filename}")
-        return
+        return 0
+
+    offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    headers = {"Range": f"bytes={offset}-"} if offset else {}
+    print(f"Downloading: {url}" + (f" (resuming at {offset} bytes)" if offset else ""))
+
+    response = (session or requests).get(url, headers=headers, stream=True)
+    if response.status_code == 416 and offset:
+        # Our partial file does not fit the server's copy; start again, once
+        # (a second 416 is raised below)
+        response.close()
+        os.remove(part_path)
+        offset = 0
+        print(f"Restarting download: {url}")
+        response = (session or requests).get(url, stream=True)
 
-    print(f"Downloading: {url}")
-    response = requests.get(url, stream=True)
-    response.raise_for_status()
-    with open(filepath, 'wb') as f:
-        for chunk in response.iter_content(chunk_size=8192):
-            f.write(chunk)
+    # closing the response hands its connection back to the pool
+    with response:
+        response.raise_for_status()
+        if response.status_code != 206:
+            offset = 0  # server ignored the Range header and sent the whole file
+        total = expected_size(response, offset)
+
+        fetched = 0
+        with open(part_path, "ab" if offset else "wb") as f:
+            for chunk in response.iter_content(chunk_size=64 * 1024):
+                f.write(chunk)
+                fetched += len(chunk)
+
+    size = os.path.getsize(part_path)
+    if total is not None and size != total:
+        raise IOError(f"Incomplete download of {filename}: {size} of {total} bytes (will resume)")
+    os.replace(part_path, filepath)
+    return fetched
+
+def download_all(links, folder, max_workers=DOWNLOAD_WORKERS, session=None):
+    """Download links concurrently; returns {link: bytes fetched or None on error}."""
+    session = session or make_session(max_workers)
+
+    def fetch(link):
+        try:
+            return download_pdf(link, folder, session)
+        except Exception as e:
+            print(f"Error downloading {link}: {e}")
+            logger.error(f"Error downloading {link}: {e}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return dict(zip(links, pool.map(fetch, links)))
 
 # === wrapping: main logic moved into run_scraper()
-def run_scraper():
+def run_scraper(offline=None, max_workers=DOWNLOAD_WORKERS):
     try:
         BASE_URL, TO_PROCESS_DIR = setup()
         os.makedirs(TO_PROCESS_DIR, exist_ok=True)
+        session = make_session(max_workers)
 
         print("Fetching PDF links...")
-        pdf_links = fetch_pdf_links(BASE_URL)
+        pdf_links = fetch_pdf_links(BASE_URL, offline, session)
         print(f"Found {len(pdf_links)} total PDF(s).")
         print(f"Found:\n{'\n'.join(pdf_links)}")
         logger.info(f"Found {len(pdf_links)} total PDF(s).")
         logger.info (f"PDF Links: {pdf_links}")
 
-        for link in pdf_links:
-            try:
-                download_pdf(link, TO_PROCESS_DIR)
-            except Exception as e:
-                print(f"Error downloading {link}: {e}")
-                logger.error(f"Error downloading {link}: {e}")
+        if http_cache.is_offline(offline):
+            print("Offline: skipping PDF downloads.")
+            logger.info("Offline: skipping PDF downloads.")
+            return True
+
+        results = download_all(pdf_links, TO_PROCESS_DIR, max_workers, session)
+        fetched = sum(size for size in results.values() if size)
+        print(f"Downloaded {fetched} bytes.")
+        logger.info(f"Downloaded {fetched} bytes.")
 
         return True
     except Exception as e:
@@ -84,6 +163,15 @@ def run_scraper():
 
 # === wrapping: safe entry point
 if __name__ == "__main__":
-    run_scraper()
+    import argparse
+    parser = argparse.ArgumentParser(description="Download SAVD decision PDFs")
+    parser.add_argument(
+        "-w", "--workers",
+        type=int,
+        default=DOWNLOAD_WORKERS,
+        help=f"Concurrent downloads (default {DOWNLOAD_WORKERS})"
+    )
+    args = parser.parse_args()
+    run_scraper(max_workers=args.workers)
 # === end wrapping
 
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+On-disk cache of rows extracted from decision PDFs.
+Entries are keyed by the PDF's SHA-256 and the extractor version, so a DB
+rebuild only re-parses files whose content or parsing logic has changed.
+Each page's rows are stored as their own zlib-compressed, column-wise
+(app numbers, decisions) blob in a small SQLite file, so a file is written
+and replayed one page at a time and memory stays flat however long the PDF
+is. Least-recently-used entries are evicted once the cache grows past
+MAX_CACHE_BYTES.
+
+A file's pages are written inside one transaction that finish() commits
+together with the file's entry, so the cache only ever holds files that
+were parsed to the end.
+"""
+
+import os
+import json
+import sqlite3
+import time
+import zlib
+
+import logging
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_PATH = os.path.abspath(os.path.join(BASE_DIR, "..", "data", "cache", "extract_cache.db"))
+MAX_CACHE_BYTES = 256 * 1024 * 1024
+
+
+def open_cache(cache_path=CACHE_PATH):
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    conn = sqlite3.connect(cache_path)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS extraction_files (
+            sha256 TEXT NOT NULL,
+            extractor_version TEXT NOT NULL,
+            page_count INTEGER NOT NULL,
+            row_count INTEGER NOT NULL,
+            size INTEGER NOT NULL,
+            last_used REAL NOT NULL,
+            PRIMARY KEY (sha256, extractor_version)
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS extraction_pages (
+            sha256 TEXT NOT NULL,
+            extractor_version TEXT NOT NULL,
+            page_number INTEGER NOT NULL,
+            row_count INTEGER NOT NULL,
+            payload BLOB NOT NULL,
+            PRIMARY KEY (sha256, extractor_version, page_number)
+        )
+    """)
+    conn.commit()
+    return conn
+
+
+def encode_rows(rows):
+    """Pack one page's [[app_number, decision], ...] into a compressed blob."""
+    columns = [[app_number for app_number, _ in rows], [decision for _, decision in rows]]
+    return zlib.compress(json.dumps(columns, separators=(",", ":")).encode("utf-8"), 9)
+
+
+def decode_rows(blob):
+    app_numbers, decisions = json.loads(zlib.decompress(blob))
+    return [[app_number, decision] for app_number, decision in zip(app_numbers, decisions)]
+
+
+def has(conn, sha256, extractor_version):
+    """Whether the file is cached; a hit counts as a use for eviction."""
+    cur = conn.execute(
+        "UPDATE extraction_files SET last_used = ? WHERE sha256 = ? AND extractor_version = ?",
+        (time.time(), sha256, extractor_version)
+    )
+    conn.commit()
+    return cur.rowcount > 0
+
+
+def iter_pages(conn, sha256, extractor_version, first_page=1):
+    """Yield the cached (page_number, rows) of a file from first_page on,
+    decoding one page at a time."""
+    cur = conn.execute("""
+        SELECT page_number, payload FROM extraction_pages
+        WHERE sha256 = ? AND extractor_version = ? AND page_number >= ?
+        ORDER BY page_number
+    """, (sha256, extractor_version, first_page))
+    for page_number, payload in cur:
+        yield page_number, decode_rows(payload)
+
+
+def put_page(conn, sha256, extractor_version, page_number, rows):
+    """Add one page of a file being cached (not committed; see finish)."""
+    conn.execute("""
+        INSERT OR REPLACE INTO extraction_pages (sha256, extractor_version, page_number, row_count, payload)
+        VALUES (?, ?, ?, ?, ?)
+    """, (sha256, extractor_version, page_number, len(rows), encode_rows(rows)))
+
+
+def finish(conn, sha256, extractor_version, max_bytes=MAX_CACHE_BYTES):
+    """Record the file whose pages were put and commit it; returns
+    (pages, rows) cached for it."""
+    page_count, row_count, size = conn.execute("""
+        SELECT COUNT(*), COALESCE(SUM(row_count), 0), COALESCE(SUM(length(payload)), 0)
+        FROM extraction_pages WHERE sha256 = ? AND extractor_version = ?
+    """, (sha256, extractor_version)).fetchone()
+    conn.execute("""
+        INSERT OR REPLACE INTO extraction_files (sha256, extractor_version, page_count, row_count, size, last_used)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, (sha256, extractor_version, page_count, row_count, size, time.time()))
+    conn.commit()
+    evict(conn, max_bytes)
+    return page_count, row_count
+
+
+def put(conn, sha256, extractor_version, page_rows, max_bytes=MAX_CACHE_BYTES):
+    """Cache a whole file from an iterable of (page_number, rows); returns
+    (pages, rows) cached."""
+    try:
+        for page_number, rows in page_rows:
+            put_page(conn, sha256, extractor_version, page_number, rows)
+    except BaseException:
+        conn.rollback()  # no partial entries
+        raise
+    return finish(conn, sha256, extractor_version, max_bytes)
+
+
+def evict(conn, max_bytes=MAX_CACHE_BYTES):
+    """Drop least-recently-used entries until the payloads fit in max_bytes."""
+    total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM extraction_files").fetchone()[0]
+    if total <= max_bytes:
+        return 0
+
+    evicted = 0
+    for sha256, extractor_version, size in conn.execute(
+        "SELECT sha256, extractor_version, size FROM extraction_files ORDER BY last_used"
+    ).fetchall():
+        if total <= max_bytes:
+            break
+        for table in ("extraction_pages", "extraction_files"):
+            conn.execute(
+                f"DELETE FROM {table} WHERE sha256 = ? AND extractor_version = ?",
+                (sha256, extractor_version)
+            )
+        total -= size
+        evicted += 1
+    conn.commit()
+    logger.info(f"Evicted {evicted} extraction cache entries")
+    return evicted
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Page extraction engines for SAVD decision PDFs.
+Every engine turns one pdfplumber page into [app_number, decision] rows.
+
+  table - pdfplumber's full line/edge table detection (the reference)
+  words - reads words against a fixed column boundary learned from the
+          header, and falls back to "table" on any page whose output does
+          not validate
+
+SAVD PDFs are a fixed two-column layout, so "words" skips most of the
+layout analysis "table" does. "table" stays the default until "words" has
+been diffed row for row against it across the archived PDFs (run
+benchmarks/bench_extract.py on the archive); until then "words" is opt-in
+through processor.py --engine words.
+"""
+
+import re
+
+import logging
+logger = logging.getLogger(__name__)
+
+DEFAULT_ENGINE = "table"
+
+# Part of the extraction cache key: bump an engine's version whenever its
+# output could change
+ENGINE_VERSIONS = {
+    "table": "extract_table-1",
+    "words": "words-1",
+}
+
+APP_NUMBER_RE = re.compile(r"^[A-Za-z0-9][A-Za-z0-9/-]*$")
+KNOWN_DECISIONS = {"approved", "refused"}
+# Words whose tops are this close (in points) are on the same line
+LINE_TOLERANCE = 3
+
+
+def engine_version(engine):
+    return ENGINE_VERSIONS[engine]
+
+
+# === table engine ===
+def table_rows(page):
+    rows = []
+    for row in page.extract_table() or []:
+        if "Application Number" in row[0] or "Decision" in row[1]:
+            continue
+        if row[0] and row[1]:
+            rows.append([row[0].strip(), row[1].strip()])
+    return rows
+
+
+# === words engine ===
+def learn_boundary(page):
+    """x position between the two columns, from the "Decision" header word."""
+    for word in page.extract_words():
+        if word["text"] == "Decision":
+            return word["x0"] - 1
+    return None
+
+
+def group_lines(words):
+    lines = []
+    for word in sorted(words, key=lambda w: (w["top"], w["x0"])):
+        if lines and abs(word["top"] - lines[-1][0]["top"]) <= LINE_TOLERANCE:
+            lines[-1].append(word)
+        else:
+            lines.append([word])
+    return lines
+
+
+def word_rows(page, boundary):
+    """Return the page's rows, or None if the page does not validate.
+
+    A line is a data line if its left column looks like an application
+    number or its right column is a known decision; every data line must
+    have both. Other lines (titles, the header, footers) are ignored.
+    """
+    rows = []
+    for line in group_lines(page.extract_words()):
+        left = " ".join(w["text"] for w in line if w["x1"] <= boundary)
+        right = " ".join(w["text"] for w in line if w["x1"] > boundary)
+        if left == "Application Number" and right == "Decision":
+            continue
+        is_app_number = bool(APP_NUMBER_RE.match(left))
+        is_decision = right.lower() in KNOWN_DECISIONS
+        if is_app_number and is_decision:
+            rows.append([left, right])
+        elif is_app_number or is_decision:
+            return None
+    return rows
+
+
+# === engine factory ===
+def make_engine(engine, pdf):
+    """Return extract(page) -> (rows, engine_used) for one open PDF."""
+    if engine == "table":
+        return lambda page: (table_rows(page), "table")
+    if engine != "words":
+        raise ValueError(f"Unknown extraction engine: {engine}")
+
+    # Learned once per PDF from its first page, so every shard of the same
+    # file uses the same boundary
+    boundary = None
+    if pdf.pages:
+        boundary = learn_boundary(pdf.pages[0])
+        pdf.pages[0].close()
+
+    def extract(page):
+        rows = word_rows(page, boundary) if boundary is not None else None
+        if rows is None or (not rows and page.extract_words()):
+            # Words on the page but no data lines: let table detection decide
+            return table_rows(page), "table"
+        return rows, "words"
+    return extract
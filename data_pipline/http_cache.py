@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Small on-disk HTTP cache for the visa desk page.
+Each URL's last response body is stored with its ETag/Last-Modified
+headers under data/cache/http, and later fetches are conditional so an
+unchanged page comes back as 304 Not Modified.
+
+Offline mode (offline=True or VISA_OFFLINE=1) never touches the network
+and replays the cached response instead.
+"""
+
+import os
+import json
+import hashlib
+import tempfile
+from collections import namedtuple
+from datetime import datetime, timezone
+
+import requests
+
+import logging
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.abspath(os.path.join(BASE_DIR, "..", "data", "cache", "http"))
+
+# status is the HTTP status (200 or 304) or "offline"
+CachedResponse = namedtuple("CachedResponse", ["text", "status", "not_modified"])
+
+
+def is_offline(offline=None):
+    if offline is None:
+        return os.environ.get("VISA_OFFLINE") == "1"
+    return offline
+
+
+def cache_paths(url):
+    key = hashlib.sha256(url.encode("utf-8")).hexdigest()[:32]
+    return os.path.join(CACHE_DIR, f"{key}.json"), os.path.join(CACHE_DIR, f"{key}.body")
+
+
+def write_atomic(path, data):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def load(url):
+    """Return (meta, text) for a cached URL, or (None, None)."""
+    meta_path, body_path = cache_paths(url)
+    if not (os.path.exists(meta_path) and os.path.exists(body_path)):
+        return None, None
+    with open(meta_path, "r") as f:
+        meta = json.load(f)
+    with open(body_path, "rb") as f:
+        text = f.read().decode(meta.get("encoding") or "utf-8", errors="replace")
+    return meta, text
+
+
+def store(url, response):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    meta_path, body_path = cache_paths(url)
+    meta = {
+        "url": url,
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+        "encoding": response.encoding,
+        "fetched_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        # Set by confirm() once a run has acted on this body; until then
+        # the next fetch is unconditional so nothing gets skipped
+        "confirmed": False,
+    }
+    write_atomic(body_path, response.content)
+    write_atomic(meta_path, json.dumps(meta, indent=2).encode("utf-8"))
+
+
+def confirm(url):
+    """Mark the cached body as fully handled, enabling conditional requests."""
+    meta_path, _ = cache_paths(url)
+    if not os.path.exists(meta_path):
+        return
+    with open(meta_path, "r") as f:
+        meta = json.load(f)
+    meta["confirmed"] = True
+    write_atomic(meta_path, json.dumps(meta, indent=2).encode("utf-8"))
+
+
+def fetch(url, headers=None, offline=None, session=None):
+    """GET url through the cache and return a CachedResponse.
+
+    not_modified is True only when the server answered 304 to a conditional
+    request for a body that an earlier run confirmed.
+    """
+    meta, cached_text = load(url)
+
+    if is_offline(offline):
+        if meta is None:
+            raise RuntimeError(f"Offline mode: no cached response for {url}")
+        print(f"Offline: replaying cached response for {url} (fetched {meta['fetched_at']})")
+        logger.info(f"Offline: replaying cached response for {url}")
+        return CachedResponse(cached_text, "offline", False)
+
+    request_headers = dict(headers or {})
+    if meta and meta.get("confirmed"):
+        if meta.get("etag"):
+            request_headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            request_headers["If-Modified-Since"] = meta["last_modified"]
+
+    response = (session or requests).get(url, headers=request_headers)
+    if response.status_code == 304 and meta is not None:
+        logger.info(f"Not modified: {url}")
+        return CachedResponse(cached_text, 304, True)
+
+    response.raise_for_status()
+    store(url, response)
+    return CachedResponse(response.text, response.status_code, False)
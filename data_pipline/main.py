@@ -9,11 +9,17 @@ and updating the Streamlit dashboard with new data.
 # /home/trev/Dropbox/programming/python/visa_dashboard_app/data_pipline/main.py
 
 
-from scraper import run_scraper
-from processor import run_processor
+# scraper, downloader and http_cache (requests, bs4) are imported in
+# build_stages, so a cron run that exits early never pays for them
+from processor import run_processor, extract_pending, update_streamlit_data
+from processor import paths as processor_paths
+from pipeline import Stage, StageOutput, StopPipeline, run_stages, format_timings
+import metrics
+import planner
+import argparse
 import logging
 import os
-import sys
+from collections import Counter, namedtuple
 # import sqlite3
 import db
 from datetime import datetime, timedelta
@@ -71,10 +77,11 @@ def check_last_run():
 
 
 
-def main():
+def main(offline=None):
     print("📥 Starting scheduled data pipeline...")
     logging.info("STARTING scheduled data pipeline...") 
     # conn = sqlite3.connect(DB_PATH)
+    db.migrate(db.connect())  # bring every table check_last_run and the stages use up to date
     last_updated, last_run = check_last_run()
     print(f"Last updated: {last_updated}, Last run: {last_run}")
     logging.info(f"Last updated: {last_updated}, Last run: {last_run}") 
@@ -91,37 +98,156 @@ def main():
         logging.info("Data was already updated today. No need to run the pipeline again.")
         return False
 
-    # works up to here - returns a list of pdf links
-    # To add
-    # check what pdf links are in table and compare to what is scraped
-    pdf_links = run_scraper()
-    scraped_files = db.get_scraped_files()
-    scraped_filenames = {row[0] for row in scraped_files}  # set of filenames already in DB
-    print(scraped_files)
-    print(scraped_filenames)
-    if not pdf_links:
-        print("❌ Scraper failed or found no PDF links. Aborting pipeline.")
-        logging.error("Scraper failed or found no PDF links. Aborting pipeline.") 
-        return False
-    # now i need to store the pdf links in the db
-    pdf_links_str = "\n".join(pdf_links)
-    # add list of pdf links to settings table as last_scraped_pdfs
+    run = metrics.start_run("main")
+    stats = Counter()
+    timings, values = run_stages(build_stages(offline, stats))
+    db.set_setting("last_run", now.isoformat(timespec="seconds"))
+
+    report = format_timings(timings)
+    print(f"⏱️ Stage timings:\n{report}")
+    logging.info(f"Stage timings:\n{report}")
 
-    sys.exit() # bug out for testing
+    failed = [t for t in timings if t.status == "failed"]
+    if failed:
+        status = "failed"
+    elif any(t.status == "stopped" for t in timings):
+        status = "stopped"
+    else:
+        status = "ok"
+    metrics.finish_run(run, status, stats, metrics.stage_metrics(timings))
+
+    if failed:
+        print(f"❌ Pipeline failed in {failed[0].name}: {failed[0].note}")
+        logging.error(f"Pipeline failed in {failed[0].name}: {failed[0].note}")
+        return False
 
-    if run_scraper():
-        print("🧮 Scraper ran successfully. Proceeding to processing...")
-        new_records = run_processor()
+    # only a run that pushed new data counts as an update
+    if values.get("publish"):
+        db.set_setting("last_updated", now.isoformat(timespec="seconds"))
+        return True
+    return False
+
+# === PIPELINE STAGES ===
+# new_records from run_processor, pending = planned PDFs that did not complete
+LoadResult = namedtuple("LoadResult", ["new_records", "pending"])
+# set while decisions.db has rows that have not been pushed yet
+PUBLISH_PENDING = "publish_pending"
+
+def build_stages(offline=None, stats=None):
+    """The pipeline as stages: scrape -> plan -> download -> extract -> load -> publish -> notify.
+
+    A publish that fails leaves PUBLISH_PENDING set and the page's HTTP cache
+    unconfirmed, so the next run fetches the page again and, even with no new
+    PDFs, goes on to retry the push. Run metrics (PDFs seen, bytes
+    downloaded, pages, rows) are added to the stats Counter.
+    """
+    import http_cache
+    from downloader import download_all
+    from downloader import setup as downloader_setup
+    from scraper import scrape
+    from scraper import setup as scraper_setup
+
+    stats = Counter() if stats is None else stats
+
+    def scrape_stage():
+        scrape_result = scrape(offline)
+        if not scrape_result or not scrape_result.pdf_links:
+            raise RuntimeError("Scraper failed or found no PDF links")
+        if scrape_result.not_modified:
+            print("🟡 Visa desk page not modified (304). Nothing new to process.")
+            logging.info("Visa desk page not modified (304). Nothing new to process.")
+            raise StopPipeline("visa desk page not modified (304)")
+        stats["pdfs_seen"] += len(scrape_result.pdf_links)
+        return StageOutput(scrape_result, len(scrape_result.pdf_links))
+
+    def plan_stage(scrape):
+        # Only PDFs that are not in scraped_files yet (or have moved) need any work
+        plan = planner.plan_downloads(scrape.pdf_links, db.get_scraped_files())
+        print(f"📋 {len(plan)} PDF(s) to fetch:\n{planner.describe(plan)}")
+        logging.info(f"{len(plan)} PDF(s) to fetch: {[item.filename for item in plan]}")
+        if not plan:
+            if db.get_setting(PUBLISH_PENDING):
+                print("🟡 No new PDFs published; retrying the last push.")
+                logging.info("No new PDFs published; retrying the last push.")
+                return StageOutput(plan, 0)
+            http_cache.confirm(scraper_setup())
+            print("🟡 No new PDFs published. Nothing to do.")
+            logging.info("No new PDFs published. Nothing to do.")
+            raise StopPipeline("no new or changed PDFs")
+        return StageOutput(plan, len(plan))
+
+    def download_stage(plan):
+        if http_cache.is_offline(offline):
+            print("Offline: skipping PDF downloads.")
+            return StageOutput({}, 0)
+        _, to_process_dir = downloader_setup()
+        os.makedirs(to_process_dir, exist_ok=True)
+        downloads = download_all([item.url for item in plan], to_process_dir)
+        stats["bytes_downloaded"] += sum(size for size in downloads.values() if size)
+        return StageOutput(downloads, sum(size is not None for size in downloads.values()))
+
+    def extract_stage(download):
+        pages, rows = extract_pending()
+        stats["pages_parsed"] += pages
+        print(f"🧮 Parsed {pages} page(s), {rows} row(s) from new PDFs.")
+        return StageOutput(rows, rows)
+
+    def load_stage(plan, download, extract):
+        # pdfs_seen is the scraped link count, not what is sitting in to_process
+        load_stats = Counter()
+        new_records = run_processor(publish=False, stats=load_stats)
+        del load_stats["pdfs_seen"]
+        stats.update(load_stats)
         if new_records > 0:
-            print(f"✅ {new_records} new records processed and pushed.")
-            logging.info(f"New records processed and pushed: {new_records}")
+            db.set_setting(PUBLISH_PENDING, datetime.now().isoformat(timespec="seconds"))
+        pending = planner.record_completed(plan, download)
+        return StageOutput(LoadResult(new_records, pending), new_records)
+
+    def publish_stage(load):
+        # value: whether decisions.db was pushed
+        if not db.get_setting(PUBLISH_PENDING):
+            return StageOutput(False, 0)
+        _, _, app_path, _, _ = processor_paths()
+        if not update_streamlit_data(app_path):
+            raise RuntimeError("decisions.db was not pushed; the push is retried next run")
+        db.delete_setting(PUBLISH_PENDING)
+        return StageOutput(True, 1)
+
+    def notify_stage(load, publish):
+        if publish and load.new_records > 0:
+            print(f"✅ {load.new_records} new records processed and pushed.")
+            logging.info(f"New records processed and pushed: {load.new_records}")
+        elif publish:
+            print("✅ No new records; records from an earlier run pushed.")
+            logging.info("No new records; records from an earlier run pushed.")
         else:
             print("🟡 No new records found. No update pushed.")
             logging.info("No new records found. No update pushed.")
-    else:
-        print("❌ Scraper failed. Aborting pipeline.")
-        logging.error("Scraper failed. Aborting pipeline.") 
+        if load.pending:
+            print(f"⚠️ {len(load.pending)} PDF(s) did not complete and will be retried next run.")
+        else:
+            # The page has now been fully handled, so later runs can ask for 304s
+            http_cache.confirm(scraper_setup())
+        return StageOutput(None, len(load.pending))
+
+    return [
+        Stage("scrape", scrape_stage, ()),
+        Stage("plan", plan_stage, ("scrape",)),
+        Stage("download", download_stage, ("plan",)),
+        Stage("extract", extract_stage, ("download",)),
+        Stage("load", load_stage, ("plan", "download", "extract")),
+        Stage("publish", publish_stage, ("load",)),
+        Stage("notify", notify_stage, ("load", "publish")),
+    ]
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scrape, process and publish visa decisions")
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="Replay cached HTTP responses instead of using the network"
+    )
+    args = parser.parse_args()
+
     setup_logging(debug=True)
-    main()
+    main(offline=args.offline or None)
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Structured run metrics for the data pipeline.
+Every run of main.main or processor.run_processor gets a row in
+pipeline_runs and its numbers in pipeline_metrics (decisions.db). The same
+numbers are written as a Prometheus textfile-collector file so throughput
+can be graphed across runs without parsing logs.
+"""
+
+import os
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import db
+
+import logging
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Point PROM_TEXTFILE_DIR at node_exporter's --collector.textfile.directory
+PROM_TEXTFILE_DIR = os.environ.get(
+    "PROM_TEXTFILE_DIR",
+    os.path.abspath(os.path.join(BASE_DIR, "..", "data", "metrics"))
+)
+PROM_FILENAME = "visa_pipeline.prom"
+
+METRIC_HELP = {
+    "pdfs_seen": "SAVD PDFs seen by the run",
+    "bytes_downloaded": "Bytes of PDF downloaded",
+    "pages_parsed": "PDF pages parsed (extraction cache hits excluded)",
+    "rows_extracted": "Decision rows extracted from PDFs",
+    "rows_inserted": "New decision rows inserted into decisions.db",
+    "run_seconds": "Wall-clock duration of the run",
+    "stage_seconds": "Wall-clock duration of each pipeline stage",
+    "stage_cpu_seconds": "CPU time of each pipeline stage",
+    "stage_items": "Items counted by each pipeline stage",
+}
+RUN_METRICS = ["pdfs_seen", "bytes_downloaded", "pages_parsed", "rows_extracted", "rows_inserted"]
+
+
+def utc_now():
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+def start_run(entry_point):
+    """Insert a pipeline_runs row and return (run_id, start time for finish_run)."""
+    conn = db.connect()
+    db.migrate(conn)  # run_processor records its run before it opens decisions.db
+    with conn:
+        cur = conn.execute(
+            "INSERT INTO pipeline_runs (entry_point, started_at) VALUES (?, ?)",
+            (entry_point, utc_now())
+        )
+        return cur.lastrowid, time.perf_counter()
+
+
+def stage_metrics(timings):
+    """Turn pipeline StageTimings into {(name, stage): value} metrics."""
+    metrics = {}
+    for t in timings:
+        metrics[("stage_seconds", t.name)] = t.wall_seconds
+        metrics[("stage_cpu_seconds", t.name)] = t.cpu_seconds
+        metrics[("stage_items", t.name)] = t.items
+    return metrics
+
+
+def finish_run(run, status, counts, extra=None):
+    """Record a run's metrics in decisions.db and the Prometheus textfile.
+
+    counts is {name: value} for the run-level metrics in METRIC_HELP; extra
+    is {(name, stage): value} for per-stage metrics.
+    """
+    run_id, started = run
+    # Every run reports every run-level metric, so a graph has no gaps
+    metrics = {(name, ""): counts.get(name, 0) for name in RUN_METRICS}
+    metrics.update({(name, ""): value for name, value in counts.items()})
+    metrics[("run_seconds", "")] = time.perf_counter() - started
+    metrics.update(extra or {})
+
+    with db.connect() as conn:
+        conn.execute(
+            "UPDATE pipeline_runs SET finished_at = ?, status = ? WHERE id = ?",
+            (utc_now(), status, run_id)
+        )
+        conn.executemany(
+            "INSERT OR REPLACE INTO pipeline_metrics (run_id, name, stage, value) VALUES (?, ?, ?, ?)",
+            [(run_id, name, stage, float(value)) for (name, stage), value in metrics.items()]
+        )
+
+    try:
+        write_textfile(metrics, status)
+    except OSError as e:
+        print(f"Could not write Prometheus metrics: {e}")
+        logger.error(f"Could not write Prometheus metrics: {e}")
+    return metrics
+
+
+def format_textfile(metrics, status):
+    lines = []
+    for name in sorted({name for name, _ in metrics}):
+        metric = f"visa_pipeline_{name}"
+        lines.append(f"# HELP {metric} {METRIC_HELP.get(name, name)}")
+        lines.append(f"# TYPE {metric} gauge")
+        for (n, stage), value in sorted(metrics.items()):
+            if n != name:
+                continue
+            label = f'{{stage="{stage}"}}' if stage else ""
+            lines.append(f"{metric}{label} {float(value):g}")
+    # A run stopped early (304, nothing new) still counts as a success
+    lines.append("# HELP visa_pipeline_last_run_success Whether the last run finished without failing")
+    lines.append("# TYPE visa_pipeline_last_run_success gauge")
+    lines.append(f"visa_pipeline_last_run_success {0 if status == 'failed' else 1}")
+    lines.append("# HELP visa_pipeline_last_run_timestamp_seconds Unix time the last run finished")
+    lines.append("# TYPE visa_pipeline_last_run_timestamp_seconds gauge")
+    lines.append(f"visa_pipeline_last_run_timestamp_seconds {time.time():.0f}")
+    return "\n".join(lines) + "\n"
+
+
+def write_textfile(metrics, status, directory=None):
+    """Atomically replace the .prom file so node_exporter never reads half of it."""
+    directory = directory or PROM_TEXTFILE_DIR
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        f.write(format_textfile(metrics, status))
+    os.chmod(tmp_path, 0o644)
+    os.replace(tmp_path, os.path.join(directory, PROM_FILENAME))
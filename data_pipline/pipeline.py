@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Minimal stage runner for the data pipeline.
+A run is a list of Stages, each naming the stages it needs. Every stage
+runs exactly once. A stage starts as soon as the stages it depends on have
+finished, so independent stages run at the same time. Wall-clock time, CPU
+time and an item count are recorded for every stage.
+
+A stage function receives its dependencies' outputs as keyword arguments
+and returns a StageOutput. Raising StopPipeline ends the run cleanly: stages
+that depend on the stopped one are marked skipped.
+"""
+
+import time
+import resource
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import logging
+logger = logging.getLogger(__name__)
+
+# after is a tuple of stage names whose outputs are passed to func
+Stage = namedtuple("Stage", ["name", "func", "after"])
+# value is handed to downstream stages, items is what the stage counted
+StageOutput = namedtuple("StageOutput", ["value", "items"])
+# status is "ok", "stopped", "skipped" or "failed"
+StageTiming = namedtuple("StageTiming", ["name", "status", "wall_seconds", "cpu_seconds", "items", "note"])
+
+
+class StopPipeline(Exception):
+    """Raised by a stage when there is nothing left for later stages to do."""
+
+
+def children_cpu():
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def timed_call(stage, kwargs, children_lock):
+    """Run one stage and return (StageTiming, value).
+
+    CPU time is this thread's CPU plus any CPU used by child processes that
+    finished during the stage (e.g. a ProcessPoolExecutor); child time is
+    shared between stages running at the same moment, so it is only exact
+    for stages that run alone.
+    """
+    with children_lock:
+        children_before = children_cpu()
+    wall_start = time.perf_counter()
+    cpu_start = time.thread_time()
+    status, note, value, items = "ok", "", None, 0
+    try:
+        output = stage.func(**kwargs)
+        value, items = output.value, output.items
+    except StopPipeline as e:
+        status, note = "stopped", str(e)
+    except Exception as e:
+        status, note = "failed", f"{type(e).__name__}: {e}"
+        logger.exception(f"Stage {stage.name} failed")
+    cpu = time.thread_time() - cpu_start
+    wall = time.perf_counter() - wall_start
+    with children_lock:
+        cpu += children_cpu() - children_before
+    return StageTiming(stage.name, status, wall, cpu, items, note), value
+
+
+def run_stages(stages, max_workers=4):
+    """Run stages in dependency order, concurrently where possible.
+
+    Returns (timings in completion order, {stage name: value}).
+    """
+    by_name = {stage.name: stage for stage in stages}
+    for stage in stages:
+        missing = [dep for dep in stage.after if dep not in by_name]
+        if missing:
+            raise ValueError(f"Stage {stage.name} depends on unknown stage(s) {missing}")
+
+    values, timings, done = {}, [], {}
+    running = {}
+    children_lock = threading.Lock()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while len(done) < len(stages):
+            progressed = False
+            for stage in stages:
+                if stage.name in done or stage.name in running.values():
+                    continue
+                statuses = [done.get(dep) for dep in stage.after]
+                if any(s in ("stopped", "skipped", "failed") for s in statuses):
+                    blocked_by = [dep for dep in stage.after if done.get(dep) != "ok"]
+                    timings.append(StageTiming(stage.name, "skipped", 0.0, 0.0, 0, f"after {', '.join(blocked_by)}"))
+                    done[stage.name] = "skipped"
+                    progressed = True
+                elif all(s == "ok" for s in statuses):
+                    kwargs = {dep: values[dep] for dep in stage.after}
+                    running[pool.submit(timed_call, stage, kwargs, children_lock)] = stage.name
+                    progressed = True
+
+            if not running:
+                if not progressed:
+                    raise ValueError("Stage dependencies contain a cycle")
+                continue
+            finished, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                timing, value = future.result()
+                timings.append(timing)
+                values[name] = value
+                done[name] = timing.status
+
+    return timings, values
+
+
+def format_timings(timings):
+    lines = [f"{'stage':<10} {'status':<8} {'wall s':>8} {'cpu s':>8} {'items':>8}"]
+    for t in timings:
+        line = f"{t.name:<10} {t.status:<8} {t.wall_seconds:>8.2f} {t.cpu_seconds:>8.2f} {t.items:>8}"
+        if t.note:
+            line += f"  {t.note}"
+        lines.append(line)
+    return "\n".join(lines)
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Work planner for the data pipeline.
+Diffs the freshly scraped PDF links against the scraped_files table so only
+new or changed PDFs are downloaded and processed, and records each PDF in
+scraped_files once it has made it into the database.
+"""
+
+import os
+from collections import namedtuple
+
+import db
+
+import logging
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+TO_PROCESS_DIR = os.path.abspath(os.path.join(BASE_DIR, "..", "data", "pdf", "to_process"))
+
+# reason is "new" (filename never seen) or "changed" (same filename, new URL)
+PlannedFile = namedtuple("PlannedFile", ["filename", "url", "reason"])
+
+
+def plan_downloads(pdf_links, scraped_files):
+    """Return a PlannedFile for every scraped link that still needs work.
+
+    scraped_files is the output of db.get_scraped_files(). Duplicate links on
+    the page are only planned once.
+    """
+    known = {filename: url for filename, url, _ in scraped_files}
+    plan = []
+    planned = set()
+    for url in pdf_links:
+        filename = os.path.basename(url)
+        if filename in planned:
+            continue
+        if filename not in known:
+            plan.append(PlannedFile(filename, url, "new"))
+        elif known[filename] != url:
+            plan.append(PlannedFile(filename, url, "changed"))
+        else:
+            continue
+        planned.add(filename)
+    return plan
+
+
+def record_completed(plan, downloads, to_process_dir=TO_PROCESS_DIR):
+    """Add every planned PDF that was downloaded and processed to scraped_files.
+
+    downloads is the {url: bytes or None} result of downloader.download_all;
+    a PDF counts as processed once the processor has moved it out of
+    to_process. Returns the planned files that did not complete, so the next
+    run picks them up again.
+    """
+    pending = []
+    for item in plan:
+        downloaded = downloads.get(item.url) is not None
+        if downloaded and not os.path.exists(os.path.join(to_process_dir, item.filename)):
+            db.add_scraped_file(item.filename, item.url)
+        else:
+            pending.append(item)
+    if pending:
+        logger.warning(f"{len(pending)} planned PDF(s) did not complete: {[p.filename for p in pending]}")
+    return pending
+
+
+def describe(plan):
+    if not plan:
+        return "No new or changed PDFs."
+    return "\n".join(f"  {item.reason:<8} {item.filename}" for item in plan)
@@ -9,21 +9,43 @@ import os
 import re
 import sqlite3
 import shutil
-import pdfplumber
+import argparse
+import hashlib
+import time
 from datetime import datetime, date
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 import subprocess
 
+import web_path  # noqa: F401  (db_conn and charts live in visa-dashboard-web)
+import db
+import db_conn
+import decisions_schema
+import extract_cache
+import extractors
+import metrics
+
 import logging
 logger = logging.getLogger(__name__)
 
+# Pages per work unit when PDFs are parsed in a process pool
+PAGES_PER_SHARD = 10
+# Rows buffered before they are written to decisions and checkpointed
+BATCH_SIZE = 500
+
 # === wrapping: moved global setup into a function
-def setup():
+def paths():
     script_dir = os.path.dirname(os.path.abspath(__file__))
     to_process_dir = os.path.abspath(os.path.join(script_dir, "..", "data", "pdf", "to_process"))
     processed_dir = os.path.abspath(os.path.join(script_dir, "..", "data", "pdf", "processed"))
     app_path = os.path.join(script_dir, "..", "visa-dashboard-web") 
     db_path = os.path.join(app_path, "decisions.db")
     message_file = os.path.join(app_path, "message.txt")
+    return to_process_dir, processed_dir, app_path, db_path, message_file
+
+def setup():
+    to_process_dir, processed_dir, app_path, db_path, message_file = paths()
     
     os.makedirs(to_process_dir, exist_ok=True)
     os.makedirs(processed_dir, exist_ok=True)
@@ -43,30 +65,68 @@ def write_message(message, message_file):
 
 # === DATABASE SETUP ===
 def init_db(db_path):
-    conn = sqlite3.connect(db_path)
-    cur = conn.cursor()
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS decisions (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            app_number TEXT NOT NULL,
-            decision TEXT NOT NULL,
-            week TEXT NOT NULL,
-            start_date TEXT NOT NULL,
-            end_date TEXT NOT NULL, 
-            filename TEXT NOT NULL,
-            date_added TEXT DEFAULT CURRENT_TIMESTAMP,
-            UNIQUE(app_number, week)
-        )
-    """)
-    cur.execute('''
-        CREATE TABLE IF NOT EXISTS settings (
-        setting TEXT PRIMARY KEY,
-        value TEXT NOT NULL
-)
-''')
-    conn.commit()
+    """Apply any pending schema migrations (see db.migrate) and return the
+    shared connection to db_path."""
+    conn = db_conn.connect(db_path)
+    db.migrate(conn)
     return conn
 
+# === CHECKPOINTS ===
+# A file's checkpoint is written in the same transaction as each batch, so
+# after a crash it always names the last page whose rows are in decisions.
+def get_checkpoint(conn, filename):
+    """Return (last_page, rows_extracted, rows_inserted) or None."""
+    return conn.execute(
+        "SELECT last_page, rows_extracted, rows_inserted FROM ingest_checkpoints WHERE filename = ?",
+        (filename,)
+    ).fetchone()
+
+def save_checkpoint(conn, filename, last_page, rows_extracted, rows_inserted):
+    conn.execute("""
+        INSERT INTO ingest_checkpoints (filename, last_page, rows_extracted, rows_inserted, updated_at)
+        VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+        ON CONFLICT(filename) DO UPDATE SET
+            last_page=excluded.last_page,
+            rows_extracted=excluded.rows_extracted,
+            rows_inserted=excluded.rows_inserted,
+            updated_at=excluded.updated_at
+    """, (filename, last_page, rows_extracted, rows_inserted))
+
+def clear_checkpoint(conn, filename):
+    conn.execute("DELETE FROM ingest_checkpoints WHERE filename = ?", (filename,))
+    conn.commit()
+
+
+# === CONTENT LEDGER ===
+# One row per distinct PDF content (SHA-256 of the bytes) that has been
+# ingested, so renamed or re-uploaded copies are never parsed twice.
+def hash_file(filepath, chunk_size=1024 * 1024):
+    """SHA-256 hex digest of a file, read in chunks so memory stays flat."""
+    digest = hashlib.sha256()
+    with open(filepath, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def get_ledger_entry(conn, sha256):
+    """Return (filename, row_count, date_added) for an ingested hash, or None."""
+    return conn.execute(
+        "SELECT filename, row_count, date_added FROM file_ledger WHERE sha256 = ?",
+        (sha256,)
+    ).fetchone()
+
+def get_latest_ledger_entry_for_filename(conn, filename):
+    """Return (sha256, row_count) of the most recent ingest under filename, or None."""
+    return conn.execute(
+        "SELECT sha256, row_count FROM file_ledger WHERE filename = ? ORDER BY date_added DESC, rowid DESC LIMIT 1",
+        (filename,)
+    ).fetchone()
+
+def record_ledger_entry(conn, sha256, filename, size, row_count, rows_inserted):
+    conn.execute("""
+        INSERT OR REPLACE INTO file_ledger (sha256, filename, size, row_count, rows_inserted)
+        VALUES (?, ?, ?, ?, ?)
+    """, (sha256, filename, size, row_count, rows_inserted))
 
 # === FILENAME PARSING ===
 def extract_week_label(filename, today=None):
@@ -108,67 +168,270 @@ def extract_week_label(filename, today=None):
     return None, None, "Unknown-Week"
 
 # === PDF PARSING ===
-def process_pdf(filepath, week_label, message_file):
+def iter_page_rows(filepath, first_page=1, last_page=None, engine=extractors.DEFAULT_ENGINE):
+    """Yield (page_number, rows) for each page of a decisions PDF.
+
+    rows is that page's list of [app_number, decision] rows, as read by the
+    named extraction engine (see extractors.py). first_page and last_page
+    (1-based, inclusive) restrict parsing to a page range. Each page's parsed
+    objects are released once it is done, so memory stays flat however long
+    the PDF is.
+    """
+    import pdfplumber  # heavy; only needed once there is a PDF to parse
+
+    with pdfplumber.open(filepath) as pdf:
+        extract = extractors.make_engine(engine, pdf)
+        pages = pdf.pages[first_page - 1:last_page]
+        for page_number, page in enumerate(pages, start=first_page):
+            rows, used = extract(page)
+            print(f"Page {page_number}: {len(rows)} rows ({used})")
+            page.close()
+            yield page_number, rows
+
+def extract_rows(filepath, first_page=1, last_page=None, engine=extractors.DEFAULT_ENGINE):
+    """Parse a decisions PDF and return all its [app_number, decision] rows.
+
+    Has no side effects beyond printing, so it is safe to run in a worker process.
+    """
     rows = []
+    for _, page_rows in iter_page_rows(filepath, first_page, last_page, engine):
+        rows.extend(page_rows)
+    return rows
+
+def count_pages(filepath):
+    import pdfplumber
+
     with pdfplumber.open(filepath) as pdf:
-        for page_number, page in enumerate(pdf.pages, start=1):
-            table = page.extract_table()
-            print(f"Page {page_number}: table found = {bool(table)}")
-            if not table:
-                continue
-            for row in table:
-                if "Application Number" in row[0] or "Decision" in row[1]:
-                    continue
-                if row[0] and row[1]:
-                    rows.append([row[0].strip(), row[1].strip()])
-    text_to_go = f"Extracted {len(rows)} rows from {os.path.basename(filepath)}"
+        return len(pdf.pages)
+
+def plan_shards(filepath, pages_per_shard=PAGES_PER_SHARD, first_page=1):
+    """Split a PDF into (filepath, first_page, last_page) page ranges."""
+    page_count = count_pages(filepath)
+    return [
+        (filepath, first, min(first + pages_per_shard - 1, page_count))
+        for first in range(first_page, page_count + 1, pages_per_shard)
+    ]
+
+def extract_shard(shard, engine=extractors.DEFAULT_ENGINE):
+    """Worker entry point: parse one page range and time it.
+
+    Returns ([(page_number, rows), ...], seconds), page by page so the
+    parent can checkpoint and cache the shard's pages one at a time.
+    """
+    filepath, first_page, last_page = shard
+    started = time.perf_counter()
+    page_rows = list(iter_page_rows(filepath, first_page, last_page, engine))
+    return page_rows, time.perf_counter() - started
+
+def report_shard(shard, row_count, elapsed):
+    filepath, first_page, last_page = shard
+    text = f"Shard {os.path.basename(filepath)} pages {first_page}-{last_page}: {row_count} rows in {elapsed:.2f}s"
+    print(text)
+    logger.info(text)
+
+def iter_shard_rows(results, shards):
+    """Yield (page_number, rows) per page from pool results, reporting
+    each shard's timing."""
+    for shard in shards:
+        page_rows, elapsed = next(results)
+        report_shard(shard, sum(len(rows) for _, rows in page_rows), elapsed)
+        yield from page_rows
+
+def cache_pages(cache, sha256, page_rows, first_page=1, engine=extractors.DEFAULT_ENGINE, stats=None):
+    """Pass page_rows through, adding each page to the extraction cache as
+    it goes; the file's entry is committed once its last page has passed.
+
+    Only a file parsed from page 1 is cached, since a resumed parse does not
+    see the whole file. If the consumer stops early (an error while
+    loading), the pages added so far are rolled back. Parsed pages are
+    counted in stats["pages_parsed"].
+    """
+    version = extractors.engine_version(engine)
+    finished = False
+    try:
+        for page_number, rows in page_rows:
+            if first_page == 1:
+                extract_cache.put_page(cache, sha256, version, page_number, rows)
+            if stats is not None:
+                stats["pages_parsed"] += 1
+            yield page_number, rows
+        if first_page == 1:
+            extract_cache.finish(cache, sha256, version)
+        finished = True
+    finally:
+        if not finished:
+            cache.rollback()
+
+def report_extracted(row_count, filepath, message_file):
+    text_to_go = f"Extracted {row_count} rows from {os.path.basename(filepath)}"
     print(text_to_go)
     write_message(text_to_go, message_file)
-    return rows
 
-# === DATABASE INSERT ===
-def insert_into_db(conn, rows, week, start_date, end_date, filename, message_file):
-    cur = conn.cursor()
-    new_rows = 0
-    for row in rows:
-        try:
-            cur.execute("""
-                INSERT OR IGNORE INTO decisions (app_number, decision, week, start_date, end_date, filename)
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, (row[0], row[1], week, start_date, end_date, filename))
-            if cur.rowcount > 0:
-                new_rows += 1
-        except Exception as e:
-            print(f"Error inserting row: {row} | {e}")
-    conn.commit()
+def report_inserted(new_rows, message_file, resumed_rows=0):
     text_to_go = f"Inserted {new_rows} new records."
+    if resumed_rows:
+        text_to_go += f" ({resumed_rows} more were inserted before the run was interrupted.)"
     print(text_to_go)
     write_message(' - ' + text_to_go + '\n', message_file)
-    return new_rows
 
-# === STREAMLIT UPDATE ROUTINE ===
-def update_dashboard(app_path):
-    dashboard_path = os.path.join(app_path, "dashboard.py")
-    with open(dashboard_path, "r") as f:
-        lines = f.readlines()
+def process_pdf(filepath, week_label, message_file):
+    rows = extract_rows(filepath)
+    report_extracted(len(rows), filepath, message_file)
+    return rows
 
-    for i, line in enumerate(lines):
-        if line.strip().startswith("# cache-bust"):
-            lines[i] = f"# cache-bust: {datetime.now().isoformat()}\n"
-            break
+# === DATABASE INSERT ===
+# Rows go straight into decision_rows (see decisions_schema); the decisions
+# view does not report how many rows an insert through it added
+INSERT_SQL = """
+    INSERT OR IGNORE INTO decision_rows (app_number, decision, week_id, file_id)
+    VALUES (?, ?, ?, ?)
+"""
 
-    with open(dashboard_path, "w") as f:
-        f.writelines(lines)
+def insert_rows(conn, rows, week, start_date, end_date, filename):
+    """Insert rows without committing; returns the number of new records.
+
+    The batch is loaded into a temp staging table with executemany() and
+    merged into decision_rows with a single INSERT ... SELECT, ordered by
+    app_number so the UNIQUE index is filled sequentially. The week, the
+    file and any decision not seen before are added to their tables first,
+    so the merge only writes integer ids. The new-record count is SQLite's
+    own change count for the merge, which leaves out rows ignored as
+    duplicates. A batch that adds rows bumps the data version (see db_conn)
+    in the same transaction. If the merge fails, the savepoint is rolled back
+    and the rows are retried one at a time so each rejected row is reported.
+    """
+    params = []
+    for row in rows:
+        if len(row) < 2 or not row[0] or not row[1]:
+            print(f"Error inserting row: {row} | missing app_number or decision")
+            continue
+        params.append((row[0], row[1]))
 
-    print("✅ Updated dashboard.py with new cache-bust comment.")
-    logger.info("Updated dashboard.py with new cache-bust comment.")
+    cur = conn.cursor()
+    # before the savepoint, so a week or filename that is not valid raises
+    # (ValueError) with no savepoint left open
+    week_id = decisions_schema.week_id(conn, week, start_date, end_date)
+    file_id = decisions_schema.file_id(conn, filename)
+    cur.execute("CREATE TEMP TABLE IF NOT EXISTS staging_decisions (app_number TEXT, decision TEXT)")
+    cur.execute("SAVEPOINT insert_rows")
+    try:
+        cur.execute("DELETE FROM staging_decisions")
+        cur.executemany("INSERT INTO staging_decisions (app_number, decision) VALUES (?, ?)", params)
+        cur.execute("""
+            INSERT INTO decision_codes (decision)
+            SELECT DISTINCT decision FROM staging_decisions
+            WHERE decision NOT IN (SELECT decision FROM decision_codes)
+        """)
+        cur.execute("""
+            INSERT OR IGNORE INTO decision_rows (app_number, decision, week_id, file_id)
+            SELECT s.app_number, c.code, ?, ?
+            FROM staging_decisions s JOIN decision_codes c ON c.decision = s.decision
+            ORDER BY s.app_number
+        """, (week_id, file_id))
+        new_rows = cur.rowcount
+    except sqlite3.Error as e:
+        print(f"Bulk insert failed ({e}), retrying row by row")
+        cur.execute("ROLLBACK TO insert_rows")
+        new_rows = 0
+        for app_number, decision in params:
+            try:
+                cur.execute(INSERT_SQL, (app_number, decisions_schema.decision_code(conn, decision), week_id, file_id))
+                new_rows += cur.rowcount
+            except sqlite3.Error as e:
+                print(f"Error inserting row: {[app_number, decision]} | {e}")
+    if new_rows > 0:
+        db_conn.bump_data_version(conn)
+    cur.execute("DELETE FROM staging_decisions")
+    cur.execute("RELEASE insert_rows")
+    return new_rows
+
+def insert_into_db(conn, rows, week, start_date, end_date, filename, message_file):
+    new_rows = insert_rows(conn, rows, week, start_date, end_date, filename)
+    conn.commit()
+    report_inserted(new_rows, message_file)
+    return new_rows
+
+def stream_into_db(conn, page_rows, filename, checkpoint=None, batch_size=BATCH_SIZE):
+    """Batching stage: write (page_number, rows) chunks to decisions.
+
+    Rows are buffered until at least batch_size have arrived and then written
+    and committed together with a checkpoint for the last page in the batch.
+    Batches only break on page boundaries, so a checkpoint never covers half
+    a page. Returns (rows_extracted, rows_inserted) including any counts
+    carried over from checkpoint. Raises ValueError, before any page is
+    read, if filename has no week (process_pdfs skips such files first).
+    """
+    week_label, start_date, end_date = extract_week_label(filename)
+    if week_label is None:
+        raise ValueError(f"{filename}: no week in the filename ({end_date})")
+    _, rows_extracted, rows_inserted = checkpoint or (0, 0, 0)
+    batch = []
+    last_page = None
+
+    def flush():
+        nonlocal rows_inserted
+        rows_inserted += insert_rows(conn, batch, week_label, start_date, end_date, filename)
+        save_checkpoint(conn, filename, last_page, rows_extracted, rows_inserted)
+        conn.commit()
+        batch.clear()
+
+    for last_page, rows in page_rows:
+        batch.extend(rows)
+        rows_extracted += len(rows)
+        if len(batch) >= batch_size:
+            flush()
+    if last_page is not None:
+        flush()
+    return rows_extracted, rows_inserted
+
+# === CHART TILES ===
+def render_chart_tiles(conn):
+    """Pre-render the dashboard's chart windows for the new data version
+    into chart_tiles.db, which stays on this machine (it is not pushed).
+
+    A failure here is logged and otherwise ignored: the dashboard draws any
+    window it has no tile for.
+    """
+    import charts  # pandas and matplotlib; only needed after new rows
+
+    started = time.perf_counter()
+    try:
+        count = charts.render_tiles(conn)
+    except Exception as e:
+        conn.rollback()
+        print(f"❌ Could not render chart tiles: {e}")
+        logger.error(f"Could not render chart tiles: {e}")
+        return 0
+    print(f"Rendered {count} chart tile(s) in {time.perf_counter() - started:.2f}s")
+    logger.info(f"Rendered {count} chart tile(s) in {time.perf_counter() - started:.2f}s")
+    return count
 
 # === GIT COMMIT & PUSH ===
-# === GIT COMMIT & PUSH ===
+# A dashboard reader can block the WAL checkpoint for a moment; it is retried
+# this many times, this many seconds apart, before the push is abandoned
+CHECKPOINT_ATTEMPTS = 5
+CHECKPOINT_RETRY_SECONDS = 2
+
+def checkpoint_for_commit(db_path, attempts=CHECKPOINT_ATTEMPTS, retry_seconds=CHECKPOINT_RETRY_SECONDS):
+    """Checkpoint db_path until the WAL is empty; False if it never was."""
+    for attempt in range(attempts):
+        if attempt:
+            time.sleep(retry_seconds)
+        if db_conn.checkpoint(db_path):
+            return True
+    return False
+
 def commit_and_push_updates(app_path):
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     commit_msg = f"Auto update from processor script @ {timestamp}"
-    files = ["dashboard.py", "decisions.db", "message.txt"]
+    files = ["decisions.db", "message.txt"]
+
+    # Recent commits may still be in decisions.db-wal, which is not pushed:
+    # committing the .db before they are checkpointed would publish stale data
+    if not checkpoint_for_commit(os.path.join(app_path, "decisions.db")):
+        print("❌ Git commit skipped: decisions.db could not be checkpointed (a reader kept it busy)")
+        logger.error("Git commit skipped: decisions.db could not be checkpointed (a reader kept it busy)")
+        return False
 
     try:
         for fname in files:
@@ -180,54 +443,312 @@ def commit_and_push_updates(app_path):
     except subprocess.CalledProcessError as e:
         print("❌ Git operation failed:", e)
         logger.error(f"Git operation failed: {e}")
+        return False
+    return True
 
 def update_streamlit_data(app_path):
-    update_dashboard(app_path)
-    commit_and_push_updates(app_path)
+    # The dashboard's caches are keyed on the data version that insert_rows
+    # bumps, so publishing new data needs no change to dashboard.py.
+    # Returns whether the update was pushed.
+    return commit_and_push_updates(app_path)
+
+# === PER-FILE LOAD ===
+def move_to_processed(filename, to_process_dir, processed_dir):
+    if os.path.samefile(to_process_dir, processed_dir):
+        return
+    shutil.move(os.path.join(to_process_dir, filename), os.path.join(processed_dir, filename))
+    print(f"Moved to processed: {filename}")
+
+def load_file(conn, filename, sha256, page_rows, checkpoint, to_process_dir, processed_dir, message_file, batch_size=BATCH_SIZE):
+    """Stream one file's rows into the DB and move the PDF to processed.
+
+    Always runs in the parent process so there is a single writer to the DB
+    and message.txt. Returns (rows extracted, rows inserted, rows resumed):
+    the first two only count this run's work; rows resumed is what an
+    interrupted run had already inserted (from checkpoint).
+    """
+    filepath = os.path.join(to_process_dir, filename)
+    _, resumed_extracted, resumed_rows = checkpoint or (0, 0, 0)
+    rows_extracted, inserted_rows = stream_into_db(conn, page_rows, filename, checkpoint, batch_size)
+    report_extracted(rows_extracted, filepath, message_file)
+    report_inserted(inserted_rows - resumed_rows, message_file, resumed_rows)
+
+    # Ledger entry and checkpoint removal commit together, before the move:
+    # a crash in between just reprocesses the file, which INSERT OR IGNORE
+    # makes harmless
+    record_ledger_entry(conn, sha256, filename, os.path.getsize(filepath), rows_extracted, inserted_rows)
+    clear_checkpoint(conn, filename)
+    move_to_processed(filename, to_process_dir, processed_dir)
+    return rows_extracted - resumed_extracted, inserted_rows - resumed_rows, resumed_rows
+
+def skip_ingested(conn, files, to_process_dir, processed_dir, message_file):
+    """Drop files whose exact bytes are already in the ledger.
+
+    Skipped files are moved to processed without being parsed. Returns
+    (filename, sha256) for the files that still need processing.
+    """
+    to_process = []
+    for filename in files:
+        sha256 = hash_file(os.path.join(to_process_dir, filename))
+        seen = get_ledger_entry(conn, sha256)
+        if seen:
+            seen_name, row_count, date_added = seen
+            text_to_go = f"Skipped {filename} - identical to {seen_name} ({row_count} rows, ingested {date_added})"
+            print(text_to_go)
+            logger.info(text_to_go)
+            write_message(text_to_go + "\n", message_file)
+            move_to_processed(filename, to_process_dir, processed_dir)
+            continue
+
+        previous = get_latest_ledger_entry_for_filename(conn, filename)
+        if previous:
+            text_to_go = f"{filename} has changed since it was last ingested ({previous[1]} rows then)"
+            print(text_to_go)
+            logger.info(text_to_go)
+        to_process.append((filename, sha256))
+    return to_process
+
+def skip_undated(to_process, source_dir, processed_dir, message_file):
+    """Drop files whose name has no week extract_week_label can read.
+
+    Their rows could not be filed under a week, so they are reported and
+    moved to processed without being parsed (as before the compact schema,
+    when every row of such a file was rejected), rather than failing the
+    load on every run. Returns the (filename, sha256) pairs that are kept.
+    """
+    kept = []
+    for filename, sha256 in to_process:
+        week_label, _, error = extract_week_label(filename)
+        if week_label is None:
+            text_to_go = f"Skipped {filename} - no week in the filename ({error})"
+            print(text_to_go)
+            logger.info(text_to_go)
+            write_message(text_to_go + "\n", message_file)
+            move_to_processed(filename, source_dir, processed_dir)
+            continue
+        kept.append((filename, sha256))
+    return kept
+
+def resume_page(conn, filename):
+    """Return (first page to parse, checkpoint) for a file, logging any resume."""
+    checkpoint = get_checkpoint(conn, filename)
+    if checkpoint is None:
+        return 1, None
+    print(f"Resuming {filename} after page {checkpoint[0]} (checkpoint)")
+    logger.info(f"Resuming {filename} after page {checkpoint[0]} (checkpoint)")
+    return checkpoint[0] + 1, checkpoint
+
+def hash_files(files, source_dir):
+    return [(filename, hash_file(os.path.join(source_dir, filename))) for filename in files]
+
+def extract_pending(workers=1, pages_per_shard=PAGES_PER_SHARD, engine=extractors.DEFAULT_ENGINE):
+    """Parse new PDFs in to_process into the extraction cache only.
+
+    Files already in the ledger or the cache are left alone, and decisions.db
+    is not written; run_processor then loads the rows from the cache. This
+    lets a pipeline time parsing and loading as separate stages. Returns
+    (pages parsed, rows extracted).
+    """
+    to_process_dir, _, _, db_path, _ = paths()
+    os.makedirs(to_process_dir, exist_ok=True)
+    files = [f for f in os.listdir(to_process_dir) if f.lower().endswith(".pdf")]
+
+    conn = init_db(db_path)
+    cache = extract_cache.open_cache()
+    version = extractors.engine_version(engine)
+    pending = []
+    for filename, sha256 in hash_files(files, to_process_dir):
+        if get_ledger_entry(conn, sha256) or extract_cache.has(cache, sha256, version):
+            continue
+        pending.append((os.path.join(to_process_dir, filename), sha256))
+
+    pages = rows = 0
+    if workers > 1:
+        shards_per_file = [plan_shards(fp, pages_per_shard) for fp, _ in pending]
+        all_shards = [shard for shards in shards_per_file for shard in shards]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = pool.map(partial(extract_shard, engine=engine), all_shards)
+            for (filepath, sha256), shards in zip(pending, shards_per_file):
+                file_pages, file_rows = extract_cache.put(cache, sha256, version, iter_shard_rows(results, shards))
+                pages += file_pages
+                rows += file_rows
+    else:
+        for filepath, sha256 in pending:
+            file_pages, file_rows = extract_cache.put(cache, sha256, version, iter_page_rows(filepath, engine=engine))
+            pages += file_pages
+            rows += file_rows
+    return pages, rows
 
 # === wrapping: clean entry point function
-def run_processor():
+def run_processor(workers=1, pages_per_shard=PAGES_PER_SHARD, batch_size=BATCH_SIZE, rebuild=False,
+                  engine=extractors.DEFAULT_ENGINE, publish=True, stats=None):
+    """Process every PDF in to_process.
+
+    Rows are streamed page by page into the DB in batches of batch_size, with
+    a checkpoint per batch so an interrupted file resumes where it stopped.
+    Pages are read with the named extraction engine. Files already in the
+    extraction cache (same content hash and engine version) are loaded from
+    the cache instead of being parsed.
+
+    workers > 1 parses the PDFs in a process pool, split into page ranges of
+    pages_per_shard pages so one large PDF is spread over several workers.
+    The rows are still inserted by this process, one file at a time, in
+    directory order and with each file's rows in page order.
+
+    rebuild=True re-ingests every PDF in processed instead, ignoring the
+    ledger, e.g. after the DB has been rebuilt or an engine version bumped.
+
+    publish=False leaves the dashboard update and git push to the caller.
+
+    stats, if given, is a Counter that collects pdfs_seen, pages_parsed,
+    rows_extracted and rows_inserted for the caller's run metrics. Without it
+    this call is a run of its own and is recorded in pipeline_runs. Those
+    only count this run's work.
+
+    Returns the number of new rows to publish: this run's, plus any an
+    interrupted run had inserted into a file this run finished.
+    """
+    if stats is not None:
+        return process_pdfs(stats, workers, pages_per_shard, batch_size, rebuild, engine, publish)
+
+    stats = Counter()
+    run = metrics.start_run("processor")
+    try:
+        total_new_rows = process_pdfs(stats, workers, pages_per_shard, batch_size, rebuild, engine, publish)
+    except BaseException:
+        metrics.finish_run(run, "failed", stats)
+        raise
+    metrics.finish_run(run, "ok", stats)
+    return total_new_rows
+
+def process_pdfs(stats, workers, pages_per_shard, batch_size, rebuild, engine, publish):
+    """Body of run_processor; counts go into the stats Counter."""
     to_process_dir, processed_dir, app_path, db_path, message_file = setup()
+    source_dir = processed_dir if rebuild else to_process_dir
     total_new_rows = 0
-    files = [f for f in os.listdir(to_process_dir) if f.lower().endswith(".pdf")]
+    # inserted by an interrupted run whose files this run finished; they
+    # have not been published yet either
+    resumed_rows = 0
+    files = [f for f in os.listdir(source_dir) if f.lower().endswith(".pdf")]
+    stats["pdfs_seen"] += len(files)
     if not files:
         print("No PDFs to process.")
         logger.info("No PDFs to process.")
         return 0
 
     conn = init_db(db_path)
-
-    for filename in files:
-        filepath = os.path.join(to_process_dir, filename)
-        print(f"\nProcessing {filename}")
-        week_label, start_date, end_date = extract_week_label(filename)
-        rows = process_pdf(filepath, week_label, message_file)
-        inserted_rows = insert_into_db(conn, rows, week_label, start_date, end_date, filename, message_file)
-        total_new_rows += inserted_rows
-
-        dest_path = os.path.join(processed_dir, filename)
-        shutil.move(filepath, dest_path)
-        print(f"Moved to processed: {filename}")
+    if rebuild:
+        to_process = hash_files(files, source_dir)
+    else:
+        to_process = skip_ingested(conn, files, source_dir, processed_dir, message_file)
+    to_process = skip_undated(to_process, source_dir, processed_dir, message_file)
+    files = [filename for filename, _ in to_process]
+    digests = [sha256 for _, sha256 in to_process]
+    filepaths = [os.path.join(source_dir, f) for f in files]
+
+    cache = extract_cache.open_cache()
+    version = extractors.engine_version(engine)
+    cached = [extract_cache.has(cache, sha256, version) for sha256 in digests]
+    resumes = [resume_page(conn, f) for f in files]
+    print(f"Extraction cache: {sum(cached)} of {len(files)} PDF(s) already parsed")
+    logger.info(f"Extraction cache: {sum(cached)} of {len(files)} PDF(s) already parsed")
+
+    if workers > 1:
+        shards_per_file = [
+            [] if hit else plan_shards(fp, pages_per_shard, first_page)
+            for fp, hit, (first_page, _) in zip(filepaths, cached, resumes)
+        ]
+        all_shards = [shard for shards in shards_per_file for shard in shards]
+        print(f"Parsing {len(all_shards)} shard(s) with {workers} worker processes")
+        logger.info(f"Parsing {len(all_shards)} shard(s) with {workers} worker processes")
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # map() yields in submission order, so shards come back in page
+            # order and files in the same order as a serial run
+            results = pool.map(partial(extract_shard, engine=engine), all_shards)
+            for filename, sha256, hit, shards, (first_page, checkpoint) in zip(files, digests, cached, shards_per_file, resumes):
+                print(f"\nProcessing {filename}")
+                if hit:
+                    page_rows = extract_cache.iter_pages(cache, sha256, version, first_page)
+                else:
+                    page_rows = cache_pages(cache, sha256, iter_shard_rows(results, shards), first_page, engine, stats)
+                extracted, inserted, resumed = load_file(conn, filename, sha256, page_rows, checkpoint, source_dir, processed_dir, message_file, batch_size)
+                stats["rows_extracted"] += extracted
+                total_new_rows += inserted
+                resumed_rows += resumed
+    else:
+        for filename, sha256, filepath, hit, (first_page, checkpoint) in zip(files, digests, filepaths, cached, resumes):
+            print(f"\nProcessing {filename}")
+            if hit:
+                page_rows = extract_cache.iter_pages(cache, sha256, version, first_page)
+            else:
+                page_rows = cache_pages(cache, sha256, iter_page_rows(filepath, first_page, engine=engine), first_page, engine, stats)
+            extracted, inserted, resumed = load_file(conn, filename, sha256, page_rows, checkpoint, source_dir, processed_dir, message_file, batch_size)
+            stats["rows_extracted"] += extracted
+            total_new_rows += inserted
+            resumed_rows += resumed
 
     print("\nDone. All PDFs processed.")
-
-    if total_new_rows > 0:
-        write_message(f"Total new records inserted: {total_new_rows}\n", message_file)
-        print(f"Total new records inserted: {total_new_rows}")
-        logger.info(f"Total new records inserted: {total_new_rows}")
-        update_streamlit_data(app_path)
-        print("Streamlit data updated.")
+    stats["rows_inserted"] += total_new_rows
+
+    if total_new_rows > 0 or resumed_rows > 0:
+        total_text = f"Total new records inserted: {total_new_rows}"
+        if resumed_rows:
+            total_text += f" (plus {resumed_rows} inserted before the run was interrupted)"
+        write_message(total_text + "\n", message_file)
+        print(total_text)
+        logger.info(total_text)
+        render_chart_tiles(conn)
+        if publish and update_streamlit_data(app_path):
+            print("Streamlit data updated.")
     else:
         write_message("No new records inserted.\n", message_file)
         print("No new records inserted.")
         logger.info("No new records inserted.")
 
     
-    return total_new_rows
+    return total_new_rows + resumed_rows
 # === end wrapping
 
 # === safe CLI entry
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Process downloaded SAVD decision PDFs")
+    parser.add_argument(
+        "-w", "--workers",
+        type=int,
+        default=1,
+        help="Number of processes used to parse PDFs (default 1 = serial)"
+    )
+    parser.add_argument(
+        "--pages-per-shard",
+        type=int,
+        default=PAGES_PER_SHARD,
+        help=f"Pages per parallel work unit when --workers > 1 (default {PAGES_PER_SHARD})"
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=BATCH_SIZE,
+        help=f"Rows written and checkpointed per DB transaction (default {BATCH_SIZE})"
+    )
+    parser.add_argument(
+        "--engine",
+        choices=sorted(extractors.ENGINE_VERSIONS),
+        default=extractors.DEFAULT_ENGINE,
+        help=f"PDF extraction engine (default {extractors.DEFAULT_ENGINE})"
+    )
+    parser.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="Re-ingest every PDF in processed, using the extraction cache where possible"
+    )
+    args = parser.parse_args()
+
     print ("Starting processor script...",datetime.now().isoformat())
-    run_processor()
+    run_processor(
+        workers=args.workers,
+        pages_per_shard=args.pages_per_shard,
+        batch_size=args.batch_size,
+        rebuild=args.rebuild,
+        engine=args.engine
+    )
 # === end wrapping
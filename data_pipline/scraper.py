@@ -6,11 +6,13 @@ This script fetches PDF links from the South Africa Visa Desk page,
 and returns the list of links.
 """
 
-import requests
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin
+from collections import namedtuple
 import os
 
+import http_cache
+
 import logging
 logger = logging.getLogger(__name__)
 
@@ -21,14 +23,23 @@ def setup():
     return BASE_URL
 # === end wrapping
 
-def fetch_pdf_links(base_url):
+# not_modified is True when the page is unchanged since the last confirmed run
+ScrapeResult = namedtuple("ScrapeResult", ["pdf_links", "not_modified"])
+
+def fetch_pdf_links(base_url, offline=None):
     """Fetch all SAVD PDF links from the visa desk page."""
+    return fetch_page_links(base_url, offline).pdf_links
+
+def fetch_page_links(base_url, offline=None):
+    """Fetch the visa desk page through the HTTP cache and parse its SAVD PDF links."""
     headers = {
         "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36"
     }
-    response = requests.get(base_url, headers=headers)
-    response.raise_for_status()
-    soup = BeautifulSoup(response.text, "html.parser")
+    response = http_cache.fetch(base_url, headers=headers, offline=offline)
+    return ScrapeResult(parse_pdf_links(response.text, base_url), response.not_modified)
+
+def parse_pdf_links(html, base_url):
+    soup = BeautifulSoup(html, "html.parser")
     links = soup.find_all("a", href=True)
 
     pdf_links = [
@@ -40,13 +51,21 @@ def fetch_pdf_links(base_url):
 
 
 # === wrapping: main logic moved into run_scraper()
-def run_scraper():
+def run_scraper(offline=None):
+    result = scrape(offline)
+    return result.pdf_links if result else False
+
+def scrape(offline=None):
+    """Return a ScrapeResult, or False if the scrape failed."""
     try:
         BASE_URL = setup()
         # os.makedirs(TO_PROCESS_DIR, exist_ok=True)
 
         print("Fetching PDF links...")
-        pdf_links = fetch_pdf_links(BASE_URL)
+        pdf_links, not_modified = fetch_page_links(BASE_URL, offline)
+        if not_modified:
+            print("Visa desk page not modified since the last run.")
+            logger.info("Visa desk page not modified since the last run.")
         print(f"Found {len(pdf_links)} total PDF(s).")
         print(f"Found:\n{'\n'.join(pdf_links)}")
         logger.info(f"Found {len(pdf_links)} total PDF(s).")
@@ -59,7 +78,7 @@ def run_scraper():
         #         print(f"Error downloading {link}: {e}")
         #         logger.error(f"Error downloading {link}: {e}")
 
-        return pdf_links
+        return ScrapeResult(pdf_links, not_modified)
     except Exception as e:
         print(f"❌ Scraper failed: {e}")
         logger.error(f"Scraper failed: {e}")
@@ -0,0 +1,19 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Puts visa-dashboard-web on sys.path. db_conn and charts live next to the
+dashboard so the deployed app can import them too; pipeline modules that
+use them import this first:
+
+    import web_path  # noqa: F401
+    import db_conn
+"""
+
+import os
+import sys
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+WEB_DIR = os.path.abspath(os.path.join(BASE_DIR, "..", "visa-dashboard-web"))
+
+if WEB_DIR not in sys.path:
+    sys.path.insert(0, WEB_DIR)
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Per-week decision counts for the dashboard.
+weekly_summary holds one row per week (approved, refused, total,
+refused_pct, and the week's row count in decisions) so the dashboard and
+the -c email CLI read a few hundred rows instead of grouping every decision
+on each rerun.
+
+The table is kept up to date by triggers on decision_rows (created with
+it by db.py's migration 4), so every writer (the bulk insert, its row-by-row
+fallback, a manual DELETE on the decisions view) updates the weeks it
+touched in the same transaction. The counts follow
+dashboard.compute_stats: decisions are compared trimmed and case-folded,
+and total only counts Approved and Refused.
+
+    python weekly_summary.py --check      # compare with a from-scratch aggregation
+    python weekly_summary.py --rebuild    # recompute every week, then check
+"""
+
+import argparse
+import sys
+
+import db
+import decisions_schema
+
+import logging
+logger = logging.getLogger(__name__)
+
+# Rows are counted per (week_id, decision code), so the scan over
+# decision_rows only groups integers; refused_pct matches compute_stats'
+# round(2), and is NULL for a week with no Approved/Refused rows, like the
+# NaN compute_stats gives it
+AGGREGATE_SQL = f"""
+    SELECT w.label, {decisions_schema.iso_date_sql("w.start_date")}, {decisions_schema.iso_date_sql("w.end_date")},
+           SUM(n * (c.d = 'approved')), SUM(n * (c.d = 'refused')), SUM(n * (c.d IN ('approved', 'refused'))),
+           SUM(n),
+           ROUND(100.0 * SUM(n * (c.d = 'refused')) / NULLIF(SUM(n * (c.d IN ('approved', 'refused'))), 0), 2)
+    FROM (SELECT week_id, decision, COUNT(*) AS n FROM decision_rows GROUP BY week_id, decision) r
+    JOIN weeks w ON w.id = r.week_id
+    JOIN (SELECT code, lower(trim(decision)) AS d FROM decision_codes) c ON c.code = r.decision
+    GROUP BY w.id
+"""
+
+
+def rebuild(conn):
+    """Recompute every week from decisions (not committed)."""
+    conn.execute("DELETE FROM weekly_summary")
+    conn.execute(f"""
+        INSERT INTO weekly_summary (week, start_date, end_date, approved, refused, total, decisions, refused_pct)
+        {AGGREGATE_SQL}
+    """)
+
+
+def check(conn):
+    """Return the weeks where weekly_summary differs from a fresh aggregation.
+
+    Each entry is (week, stored row or None, expected row or None).
+    """
+    stored = {
+        row[0]: row for row in conn.execute(
+            "SELECT week, start_date, end_date, approved, refused, total, decisions, refused_pct FROM weekly_summary"
+        )
+    }
+    expected = {row[0]: row for row in conn.execute(AGGREGATE_SQL)}
+    return [
+        (week, stored.get(week), expected.get(week))
+        for week in sorted(stored.keys() | expected.keys())
+        if stored.get(week) != expected.get(week)
+    ]
+
+
+def report(mismatches):
+    if not mismatches:
+        print("weekly_summary matches decisions")
+        return
+    print(f"weekly_summary differs from decisions in {len(mismatches)} week(s):")
+    for week, stored, expected in mismatches:
+        print(f"  {week}: stored {stored[1:] if stored else None}, expected {expected[1:] if expected else None}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check or rebuild the weekly_summary table")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--check", action="store_true", help="Compare weekly_summary with a fresh aggregation")
+    group.add_argument("--rebuild", action="store_true", help="Recompute weekly_summary, then check it")
+    args = parser.parse_args()
+
+    with db.connect() as conn:
+        db.migrate(conn)
+        if args.rebuild:
+            rebuild(conn)
+            print("weekly_summary rebuilt")
+            logger.info("weekly_summary rebuilt")
+        mismatches = check(conn)
+    report(mismatches)
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
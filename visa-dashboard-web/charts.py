@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+The weekly decisions chart and its pre-rendered tiles.
+The chart shows CHART_WINDOW weeks at a time. Since the data only changes
+when the pipeline runs, the processor renders every window the dashboard's
+Back/Forward buttons can reach into chart_tiles right after an ingest,
+keyed by data version. A dashboard running next to the pipeline and the
+-c email CLI then serve those bytes as they are; matplotlib is only
+imported when a tile has to be drawn, and pandas only when a summary is
+read, so serving a tile (email_cli.py) stays cheap to start.
+
+Tiles are kept in chart_tiles.db next to decisions.db, not in it: they are
+about 190 KB each and decisions.db is committed on every ingest. The tile
+store is not committed either, so tiles only help on the machine that runs
+the pipeline (a local dashboard and the email CLI). The deployed Streamlit
+app has no tile store: it still draws each window with matplotlib on its
+first request, and then serves it from its chart cache (see
+dashboard.chart_png).
+
+interactive_chart is the browser-rendered alternative the dashboard offers
+for paging through history without a server round-trip per step.
+"""
+
+import io
+import os
+import sqlite3
+
+import db_conn
+
+import logging
+logger = logging.getLogger(__name__)
+
+CHART_WINDOW = 8
+# One resolution for the page, the PNG download and the email
+CHART_DPI = 200
+TILES_FILENAME = "chart_tiles.db"
+
+
+# === WINDOWS ===
+def default_start(n_weeks, window=CHART_WINDOW):
+    """First week shown when the chart opens: the most recent window."""
+    return max(0, n_weeks - window)
+
+
+def tile_starts(n_weeks, window=CHART_WINDOW):
+    """Every first week the Back/Forward buttons can reach.
+
+    Back steps down from the latest window to 0, and Forward steps up from
+    0 to the latest window; the two only line up when n_weeks is a multiple
+    of window.
+    """
+    latest = default_start(n_weeks, window)
+    back = range(latest, -1, -window)
+    forward = range(0, latest, window)
+    return sorted({0, latest, *back, *forward})
+
+
+# === DRAWING ===
+def read_weekly_summary(conn):
+    """weekly_summary as the frame dashboard.compute_stats returns."""
+    import pandas as pd
+
+    summary = pd.read_sql_query("""
+        SELECT week, approved AS Approved, refused AS Refused, total AS Total,
+               refused_pct AS "Refused %", end_date, start_date
+        FROM weekly_summary
+        ORDER BY end_date
+    """, conn)
+    summary["end_date"] = pd.to_datetime(summary["end_date"])
+    summary["start_date"] = pd.to_datetime(summary["start_date"])
+    return summary
+
+
+def draw_chart(summary, start, window=CHART_WINDOW):
+    # A bare Figure on an Agg canvas rather than pyplot: headless (no GUI
+    # backend is ever loaded), nothing global to close, and safe to draw
+    # from several Streamlit sessions at once
+    import pandas as pd
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    weeks = summary["week"]
+    approved = summary.get("Approved", pd.Series([0] * len(weeks)))
+    refused = summary.get("Refused", pd.Series([0] * len(weeks)))
+    total = summary["Total"]
+
+    # --- NEW: week-to-week % change
+    total_pct_change = total.pct_change().fillna(0) * 100
+
+    refused_pct = summary["Refused %"]
+    approved_pct = 100 - refused_pct
+
+    # --- FIXED Y-AXIS SCALE (global max across all weeks) ---
+    global_max_total = summary["Total"].max()
+    y_max = int(global_max_total * 1.1)  # 10% headroom
+
+    end = start + window
+
+    # --- Plot bars
+    fig = Figure(figsize=(12, 6))
+    FigureCanvasAgg(fig)
+    ax = fig.subplots()
+    bar1 = ax.bar(weeks[start:end], approved[start:end], label="Approved", color="green")
+    bar2 = ax.bar(
+        weeks[start:end], refused[start:end],
+        label="Refused", color="red", bottom=approved[start:end]
+    )
+
+    # --- Add annotations with combined total and percentage change ---
+    for i, (tot, pc_change) in enumerate(zip(total[start:end], total_pct_change[start:end])):
+        ax.annotate(
+            f"{int(tot)} ({pc_change:+.1f}%)",
+            xy=(i, tot),
+            xytext=(0, 3),
+            textcoords="offset points",
+            ha="center",
+            va="bottom",
+            fontsize=9,
+            fontweight="bold",
+            color="black"
+        )
+
+    # --- Add approved/refused inside bars ---
+    for rect, pct in zip(bar1, approved_pct[start:end]):
+        height = rect.get_height()
+        if height > 0:
+            ax.annotate(f"{int(height)} ({pct:.1f}%)",
+                        xy=(rect.get_x() + rect.get_width() / 2, height / 2),
+                        ha="center", va="center", color="white", fontsize=8, fontweight="bold")
+
+    for rect, base_height, pct in zip(bar2, approved[start:end], refused_pct[start:end]):
+        height = rect.get_height()
+        if height > 0:
+            ax.annotate(f"{int(height)} ({pct:.1f}%)",
+                        xy=(rect.get_x() + rect.get_width() / 2, base_height + height / 2),
+                        ha="center", va="center", color="white", fontsize=8, fontweight="bold")
+
+    # --- APPLY FIXED Y SCALE ---
+    ax.set_ylim(0, y_max)
+
+    ax.set_title("Visa Decisions per Week")
+    ax.set_ylabel("Number of Applications")
+    ax.tick_params(axis="x", rotation=45)
+    ax.grid(True, axis="y")
+    ax.legend()
+    fig.tight_layout()
+    return fig
+
+
+def render_png(summary, start, window=CHART_WINDOW, dpi=CHART_DPI):
+    buf = io.BytesIO()
+    draw_chart(summary, start, window).savefig(buf, format="png", dpi=dpi)
+    return buf.getvalue()
+
+
+# === INTERACTIVE CHART ===
+# The same chart drawn in the browser by Vega-Lite: the whole summary is sent
+# once, as a few numbers per week, and panning/zooming through the weeks
+# happens client-side with no rerun. Labels and totals are computed in the
+# browser from the payload.
+def chart_payload(summary):
+    """The compact per-week columns the interactive chart needs."""
+    import pandas as pd
+
+    total = summary["Total"]
+    return pd.DataFrame({
+        "week": summary["week"],
+        "start": summary["start_date"].dt.strftime("%Y-%m-%d"),
+        "end": summary["end_date"].dt.strftime("%Y-%m-%d"),
+        "approved": summary.get("Approved", 0),
+        "refused": summary.get("Refused", 0),
+        "change": (total.pct_change().fillna(0) * 100).round(1),
+        "refused_pct": summary["Refused %"],
+    })
+
+
+def interactive_chart(summary, window=CHART_WINDOW):
+    """An Altair chart of every week, opened on the latest window.
+
+    Drag to pan and scroll to zoom along the weeks; the y axis keeps the
+    fixed scale of the PNG chart.
+    """
+    import altair as alt
+    import pandas as pd
+
+    payload = chart_payload(summary)
+    y_max = int(summary["Total"].max() * 1.1)  # same 10% headroom as draw_chart
+    first = default_start(len(payload), window)
+    # each bar spans its week, start to end inclusive
+    x_domain = [payload["start"].iloc[first], (summary["end_date"].iloc[-1] + pd.Timedelta(days=1)).strftime("%Y-%m-%d")]
+
+    pan_zoom = alt.selection_interval(bind="scales", encodings=["x"])
+    base = alt.Chart(payload).transform_calculate(
+        total="datum.approved + datum.refused",
+        # half a day trimmed off each side leaves a gap between the weeks
+        x0="time(toDate(datum.start)) + 432e5",
+        x1="time(toDate(datum.end)) + 432e5",
+        mid="(time(toDate(datum.start)) + time(toDate(datum.end)) + 864e5) / 2",
+    )
+    x = alt.X("x0:T", title=None, scale=alt.Scale(domain=x_domain), axis=alt.Axis(format="%d %b %Y", labelAngle=-45))
+    y_scale = alt.Scale(domain=[0, y_max])
+    colors = alt.Scale(domain=["Approved", "Refused"], range=["green", "red"])
+    tooltip = ["week:N", "approved:Q", "refused:Q", "total:Q", "change:Q", "refused_pct:Q"]
+
+    approved = base.transform_calculate(decision="'Approved'").mark_bar().encode(
+        x=x, x2="x1:T",
+        y=alt.Y("approved:Q", scale=y_scale, title="Number of Applications"), y2=alt.datum(0),
+        color=alt.Color("decision:N", scale=colors, title=None),
+        tooltip=tooltip,
+    )
+    refused = base.transform_calculate(decision="'Refused'").mark_bar().encode(
+        x=x, x2="x1:T",
+        y=alt.Y("approved:Q", scale=y_scale), y2="total:Q",
+        color=alt.Color("decision:N", scale=colors, title=None),
+        tooltip=tooltip,
+    )
+    totals = base.transform_calculate(
+        label="datum.total + ' (' + format(datum.change, '+.1f') + '%)'"
+    ).mark_text(dy=-8, fontSize=11, fontWeight="bold", color="black").encode(
+        x="mid:T", y=alt.Y("total:Q", scale=y_scale), text="label:N",
+    )
+    approved_labels = base.transform_filter("datum.approved > 0").transform_calculate(
+        y="datum.approved / 2",
+        label="datum.approved + ' (' + format(100 - datum.refused_pct, '.1f') + '%)'",
+    ).mark_text(fontSize=10, fontWeight="bold", color="white").encode(
+        x="mid:T", y=alt.Y("y:Q", scale=y_scale), text="label:N",
+    )
+    refused_labels = base.transform_filter("datum.refused > 0").transform_calculate(
+        y="datum.approved + datum.refused / 2",
+        label="datum.refused + ' (' + format(datum.refused_pct, '.1f') + '%)'",
+    ).mark_text(fontSize=10, fontWeight="bold", color="white").encode(
+        x="mid:T", y=alt.Y("y:Q", scale=y_scale), text="label:N",
+    )
+
+    return alt.layer(
+        approved, refused, totals, approved_labels, refused_labels
+    ).add_params(pan_zoom).properties(title="Visa Decisions per Week", height=450)
+
+
+# === TILE STORE ===
+def tiles_path(conn):
+    """Path of the tile store next to conn's database (None if it has no file)."""
+    for _, name, path in conn.execute("PRAGMA database_list"):
+        if name == "main" and path:
+            return os.path.join(os.path.dirname(path), TILES_FILENAME)
+    return None
+
+
+def init_tables(conn):
+    """Create the tile store's table. The store is its own file, outside
+    decisions.db and its migrations, so render_tiles creates it itself."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS chart_tiles (
+            data_version INTEGER NOT NULL,
+            first_week INTEGER NOT NULL,
+            window_weeks INTEGER NOT NULL,
+            dpi INTEGER NOT NULL,
+            png BLOB NOT NULL,
+            PRIMARY KEY (data_version, first_week, window_weeks, dpi)
+        )
+    """)
+
+
+def render_tiles(conn, window=CHART_WINDOW, dpi=CHART_DPI):
+    """Render every reachable window of conn's data for its current data
+    version into the tile store.
+
+    Tiles for older versions are dropped in the same transaction, so
+    chart_tiles only ever holds one version. Returns the number of tiles.
+    """
+    version = db_conn.data_version(conn)
+    summary = read_weekly_summary(conn)
+    tiles = [
+        (version, start, window, dpi, render_png(summary, start, window, dpi))
+        for start in tile_starts(len(summary), window)
+    ]
+    store = db_conn.connect(tiles_path(conn))
+    with store:  # commits, or rolls back if an insert fails
+        init_tables(store)
+        store.execute("DELETE FROM chart_tiles")
+        store.executemany("""
+            INSERT INTO chart_tiles (data_version, first_week, window_weeks, dpi, png)
+            VALUES (?, ?, ?, ?, ?)
+        """, tiles)
+    return len(tiles)
+
+
+def get_tile(conn, data_version, start, window=CHART_WINDOW, dpi=CHART_DPI):
+    """Return a pre-rendered PNG of conn's data, or None if it was not
+    rendered for this version (or there is no tile store)."""
+    path = tiles_path(conn)
+    if path is None or not os.path.exists(path):
+        return None  # not created here on a read
+    try:
+        row = db_conn.connect(path).execute("""
+            SELECT png FROM chart_tiles
+            WHERE data_version = ? AND first_week = ? AND window_weeks = ? AND dpi = ?
+        """, (data_version, start, window, dpi)).fetchone()
+    except sqlite3.OperationalError:
+        return None  # no chart_tiles table yet
+    return row[0] if row else None
@@ -2,84 +2,204 @@
 
 import streamlit as st
 import pandas as pd
-import sqlite3
-import matplotlib.pyplot as plt
 import re
 from datetime import datetime  # CHANGED / NEW: ensure datetime imported
 import os
 import streamlit.components.v1 as components
-import io
 import sys
+from collections import Counter
+from functools import wraps
+
+import charts
+import db_conn
+import stats
 
 # --- Paths ---
 BASE_DIR = os.path.dirname(__file__)
 DB_PATH = os.path.join(BASE_DIR, "decisions.db")
 MSG_PATH = os.path.join(BASE_DIR, "message.txt")
-DASHBOARD_PATH = os.path.join(BASE_DIR, "dashboard.py")
 
+# --- Caching ---
+# Each expensive step is its own cache layer, keyed on the data version (and
+# the chart window for the chart), so paging the chart only renders the new
+# window and new data invalidates every layer at once:
+#   raw frame -> weekly summary -> advanced stats -> chart PNG -> download payloads
+# Layers are bounded by max_entries; the TTL is only a backstop, since a new
+# data version already misses every layer.
+CACHE_TTL = 6 * 60 * 60
+
+
+# {layer name: [cached functions]}, filled in by cache_layer
+CACHE_LAYERS = {}
+
+
+@st.cache_resource
+def cache_counters():
+    """Process-wide {(layer, "calls" | "misses"): count}, kept across reruns."""
+    return Counter()
+
+
+def cache_layer(name, max_entries):
+    """st.cache_data with a TTL and size bound that counts calls and misses."""
+    def decorate(func):
+        @st.cache_data(ttl=CACHE_TTL, max_entries=max_entries, show_spinner=False)
+        @wraps(func)
+        def compute(*args, **kwargs):
+            # only runs on a miss
+            cache_counters()[(name, "misses")] += 1
+            return func(*args, **kwargs)
+
+        @wraps(func)
+        def cached(*args, **kwargs):
+            cache_counters()[(name, "calls")] += 1
+            return compute(*args, **kwargs)
+
+        cached.clear = compute.clear
+        CACHE_LAYERS.setdefault(name, []).append(cached)
+        return cached
+    return decorate
+
+
+def cache_stats():
+    """Hits and misses per cache layer since the process started."""
+    counters = cache_counters()
+    rows = []
+    for name in CACHE_LAYERS:
+        calls, misses = counters[(name, "calls")], counters[(name, "misses")]
+        rows.append({"layer": name, "calls": calls, "hits": calls - misses, "misses": misses})
+    return pd.DataFrame(rows)
+
+
+def clear_caches():
+    for layer in CACHE_LAYERS.values():
+        for cached in layer:
+            cached.clear()
 
 
 # --- Load data ---
-def load_data(db_path, msg_path, db_mtime=None, msg_mtime=None, dash_mtime=None):
-    conn = sqlite3.connect(db_path) # cache buster added Tuesday Jan 27 as i pull out my hair
-    df = pd.read_sql_query("SELECT app_number, decision, week, start_date, end_date FROM decisions", conn)  # CHANGED / NEW: include start_date
-    conn.close()
-    df = df.rename(columns={"app_number": "application_number"})
-    df["end_date"] = pd.to_datetime(df["end_date"])
-    df["start_date"] = pd.to_datetime(df["start_date"])  # CHANGED / NEW: convert start_date to datetime
+def read_compact_decisions(conn):
+    """The decisions frame straight from the compact tables, or None if
+    decisions.db still has the legacy table.
+
+    decision_rows is read as plain integers and the codes, labels and
+    YYYYMMDD dates of the few hundred weeks are looked up in pandas, which
+    is much faster than formatting them row by row through the decisions
+    view.
+    """
+    has_rows = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'decision_rows'"
+    ).fetchone()
+    if has_rows is None:
+        return None
+    rows = pd.read_sql_query("SELECT app_number, decision, week_id FROM decision_rows", conn)
+    # sorted, so the categories come out in the order astype("category") gives
+    codes = pd.read_sql_query("SELECT code, decision FROM decision_codes ORDER BY decision", conn)
+    weeks = pd.read_sql_query("SELECT id, label, start_date, end_date FROM weeks ORDER BY label", conn)
+
+    week = pd.Index(weeks["id"]).get_indexer(rows["week_id"])
+    decision = pd.Index(codes["code"]).get_indexer(rows["decision"])
+    df = pd.DataFrame({
+        "application_number": rows["app_number"],
+        "decision": pd.Categorical.from_codes(decision, codes["decision"].tolist()).remove_unused_categories(),
+        "week": pd.Categorical.from_codes(week, weeks["label"].tolist()).remove_unused_categories(),
+    })
+    for column in ("start_date", "end_date"):
+        dates = pd.to_datetime(weeks[column].astype(str), format="%Y%m%d")
+        df[column] = dates.to_numpy()[week]
+    return df
+
+
+@cache_layer("raw", max_entries=2)
+def load_decisions(db_path, data_version=None):
+    # shared WAL connection, so this read is not blocked by a running ingest
+    conn = db_conn.connect(db_path)
+    df = read_compact_decisions(conn)
+    if df is None:
+        df = pd.read_sql_query("SELECT app_number, decision, week, start_date, end_date FROM decisions", conn)  # CHANGED / NEW: include start_date
+        df = df.rename(columns={"app_number": "application_number"})
+        # a few hundred distinct weeks and a couple of decisions: as categoricals
+        # the cached frame is far smaller (cheaper to copy out of st.cache_data)
+        # and stats.summarize counts their codes directly
+        df["week"] = df["week"].astype("category")
+        df["decision"] = df["decision"].astype("category")
+        df["end_date"] = pd.to_datetime(df["end_date"])
+        df["start_date"] = pd.to_datetime(df["start_date"])  # CHANGED / NEW: convert start_date to datetime
     df = df.sort_values(by="end_date")  # end_date is used for ordering
+    return df
 
+
+def load_data(db_path, msg_path, data_version=None):
+    # message.txt is small and changes without a new data version, so it is
+    # read fresh every time
+    return load_decisions(db_path, data_version), load_message(msg_path)
+
+
+def load_message(msg_path):
     with open(msg_path, "r") as f:
-        msg = f.read().strip()
+        return f.read().strip()
+
 
-    return df, msg
+def has_decisions(db_path):
+    conn = db_conn.connect(db_path)
+    return conn.execute("SELECT EXISTS (SELECT 1 FROM decisions)").fetchone()[0] == 1
+
+
+# --- Application number lookup ---
+# Served by idx_decision_rows_app_number_lower (see decisions_schema), so one
+# lookup is an index seek instead of a scan of every decision. data_version
+# is only there to key the cache, so a new ingest invalidates old answers.
+@cache_layer("lookup", max_entries=1000)
+def lookup_application(db_path, app_num, data_version=None):
+    conn = db_conn.connect(db_path)
+    results = pd.read_sql_query("""
+        SELECT app_number AS application_number, decision, week, start_date, end_date
+        FROM decisions
+        WHERE lower(app_number) = ?
+        ORDER BY end_date
+    """, conn, params=(app_num.strip().lower(),))
+    results["end_date"] = pd.to_datetime(results["end_date"])
+    results["start_date"] = pd.to_datetime(results["start_date"])
+    return results
 
 
 # --- Helper functions ---
 def compute_stats(df):
-    df["decision"] = df["decision"].str.strip().str.capitalize()
-    summary = (
-        df.groupby("week")["decision"]
-        .value_counts()
-        .unstack(fill_value=0)
-        .reset_index()
-    )
-    summary["Total"] = summary.get("Approved", 0) + summary.get("Refused", 0)
-    summary["Refused %"] = (summary.get("Refused", 0) / summary["Total"] * 100).round(2)
-    summary["end_date"] = df.groupby("week")["end_date"].first().values  # CHANGED / NEW: get end_date for each week
-    summary["start_date"] = df.groupby("week")["start_date"].first().values  # CHANGED / NEW: include start_date if needed
-    summary = summary.sort_values("end_date").reset_index(drop=True)  # CHANGED / NEW: sort by end_date
-    return summary
+    # one pass over integer codes, see stats.summarize
+    return stats.summarize(df, trends=False)
 
 
-# --- Advanced stats ---
-def advanced_stats(summary):
-    adv = summary.copy()
-    adv["Total_3wk_MA"] = adv["Total"].rolling(3, min_periods=1).mean()  # CHANGED / NEW: 3-week moving average
-    adv["Total_pct_change"] = adv["Total"].pct_change().fillna(0) * 100  # CHANGED / NEW: week-to-week % change
-    return adv
+# --- Weekly summary ---
+# weekly_summary is kept up to date at ingest time (data_pipline/weekly_summary.py),
+# so this reads one row per week and returns the same frame as compute_stats.
+# A decisions.db from before that table existed is aggregated here instead.
+@cache_layer("summary", max_entries=4)
+def load_summary(db_path, data_version=None):
+    conn = db_conn.connect(db_path)
+    has_table = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'weekly_summary'"
+    ).fetchone()
+    if not has_table:
+        return compute_stats(load_decisions(db_path, data_version))
 
+    return charts.read_weekly_summary(conn)
 
-# --- Chart function ---
-def show_chart(summary, window=8):
-    weeks = summary["week"]
-    approved = summary.get("Approved", pd.Series([0] * len(weeks)))
-    refused = summary.get("Refused", pd.Series([0] * len(weeks)))
-    total = summary["Total"]
 
-    # --- NEW: week-to-week % change
-    total_pct_change = total.pct_change().fillna(0) * 100
+# --- Advanced stats ---
+def advanced_stats(summary):
+    # 3-week moving average and week-to-week % change of Total
+    return stats.add_trends(summary.copy())
 
-    refused_pct = summary["Refused %"]
-    approved_pct = 100 - refused_pct
 
-    # --- FIXED Y-AXIS SCALE (global max across all weeks) ---
-    global_max_total = summary["Total"].max()
-    y_max = int(global_max_total * 1.1)  # 10% headroom
+@cache_layer("advanced", max_entries=4)
+def load_advanced_stats(db_path, data_version=None):
+    return advanced_stats(load_summary(db_path, data_version))
 
 
+# --- Chart function ---
+def chart_controls(n_weeks, window=charts.CHART_WINDOW):
+    """Back/Forward/Refresh buttons; returns the first week to show."""
     if "start_idx" not in st.session_state:
-        st.session_state.start_idx = max(0, len(weeks) - window)
+        st.session_state.start_idx = charts.default_start(n_weeks, window)
 
     col1, col2, col3 = st.columns([1, 2, 1])
     with col2:
@@ -89,71 +209,68 @@ def show_chart(summary, window=8):
         with right_col:
             forward_clicked = st.button("Forward >>")
         with refresh_col:
-            # Refresh button next to Back/Forward
+            # Refresh button next to Back/Forward; reruns the whole app, not
+            # just the chart fragment
             if st.button("🔄 Refresh Data"):
-                df, message = load_data(DB_PATH, MSG_PATH)
-    
+                clear_caches()
+                st.rerun(scope="app")
+
     if back_clicked:
         st.session_state.start_idx = max(0, st.session_state.start_idx - window)
     if forward_clicked:
-        st.session_state.start_idx = min(len(weeks) - window, st.session_state.start_idx + window)
-
-    start = st.session_state.start_idx
-    end = start + window
+        st.session_state.start_idx = min(n_weeks - window, st.session_state.start_idx + window)
+    return st.session_state.start_idx
 
-    # --- Plot bars
-    fig, ax = plt.subplots(figsize=(12, 6))
-    bar1 = ax.bar(weeks[start:end], approved[start:end], label="Approved", color="green")
-    bar2 = ax.bar(
-        weeks[start:end], refused[start:end],
-        label="Refused", color="red", bottom=approved[start:end]
-    )
 
-    # --- Add annotations with combined total and percentage change ---
-    for i, (tot, pc_change) in enumerate(zip(total[start:end], total_pct_change[start:end])):
-        ax.annotate(
-            f"{int(tot)} ({pc_change:+.1f}%)",
-            xy=(i, tot),
-            xytext=(0, 3),
-            textcoords="offset points",
-            ha="center",
-            va="bottom",
-            fontsize=9,
-            fontweight="bold",
-            color="black"
-        )
+@cache_layer("chart", max_entries=64)
+def chart_png(db_path, data_version, start, window=charts.CHART_WINDOW):
+    """The chart for one window as PNG bytes, shown on the page and downloaded.
 
-    # --- Add approved/refused inside bars ---
-    for rect, pct in zip(bar1, approved_pct[start:end]):
-        height = rect.get_height()
-        if height > 0:
-            ax.annotate(f"{int(height)} ({pct:.1f}%)",
-                        xy=(rect.get_x() + rect.get_width() / 2, height / 2),
-                        ha="center", va="center", color="white", fontsize=8, fontweight="bold")
+    A tile the processor rendered at ingest time where the tile store
+    exists (next to the pipeline); otherwise, as in the deployed app, drawn
+    here on the first request for each window.
+    """
+    tile = charts.get_tile(db_conn.connect(db_path), data_version, start, window)
+    if tile is not None:
+        return tile
+    return charts.render_png(load_summary(db_path, data_version), start, window)
 
-    for rect, base_height, pct in zip(bar2, approved[start:end], refused_pct[start:end]):
-        height = rect.get_height()
-        if height > 0:
-            ax.annotate(f"{int(height)} ({pct:.1f}%)",
-                        xy=(rect.get_x() + rect.get_width() / 2, base_height + height / 2),
-                        ha="center", va="center", color="white", fontsize=8, fontweight="bold")
 
+# --- Download payloads ---
+@cache_layer("downloads", max_entries=8)
+def summary_csv(db_path, data_version=None):
+    # CSV with moving average and % change
+    summary_for_csv = load_summary(db_path, data_version)
+    adv_summary = load_advanced_stats(db_path, data_version)
+    summary_for_csv["Total_3wk_MA"] = adv_summary["Total_3wk_MA"]
+    summary_for_csv["Total_pct_change"] = adv_summary["Total_pct_change"]
+    return summary_for_csv.to_csv(index=False).encode("utf-8")
 
-    # --- APPLY FIXED Y SCALE ---
-    ax.set_ylim(0, y_max)
 
-    ax.set_title("Visa Decisions per Week")
-    ax.set_ylabel("Number of Applications")
-    ax.tick_params(axis="x", rotation=45)
-    ax.grid(True, axis="y")
-    ax.legend()
-    fig.tight_layout()
+@cache_layer("downloads", max_entries=8)
+def full_csv(db_path, data_version=None):
+    return load_decisions(db_path, data_version).to_csv(index=False).encode("utf-8")
 
 
 
-    return fig
 
+# --- Chart section ---
+# A fragment, so a Back/Forward click reruns only this function: it re-slices
+# the cached summary and renders (or fetches) one chart window, instead of
+# rerunning the whole script with its tables and downloads. data_version is
+# the one from the last full run, so paging does not touch the database.
+@st.fragment
+def chart_section(data_version):
+    summary = load_summary(DB_PATH, data_version)
+    if st.toggle("Interactive chart (drag to pan, scroll to zoom)", key="interactive_chart"):
+        # every week is sent once; paging then happens in the browser
+        st.altair_chart(charts.interactive_chart(summary))
+        return
 
+    start = chart_controls(len(summary))
+    chart = chart_png(DB_PATH, data_version, start)
+    st.image(chart)
+    st.download_button("⬇️ Download Chart as PNG", chart, "weekly_chart.png", "image/png")
 
 
 # === MAIN APP ===
@@ -173,14 +290,13 @@ def main():
 
     db_mtime = os.path.getmtime(DB_PATH)
     msg_mtime = os.path.getmtime(MSG_PATH)
-    dash_mtime = os.path.getmtime(DASHBOARD_PATH)
+    # bumped by the loader whenever decisions change; every cache is keyed on it
+    data_version = db_conn.data_version(db_conn.connect(DB_PATH))
 
-    df, message = load_data(DB_PATH, MSG_PATH, db_mtime, msg_mtime, dash_mtime)
-    summary = compute_stats(df)
-    adv_summary = advanced_stats(summary)  # CHANGED / NEW
+    message = load_message(MSG_PATH)
 
     # Last updated display
-    last_updated_ts = max(db_mtime, msg_mtime, dash_mtime)
+    last_updated_ts = max(db_mtime, msg_mtime)
     last_updated = datetime.fromtimestamp(last_updated_ts).strftime("%Y-%m-%d %H:%M:%S")
     st.markdown(f"<p style='text-align:right; font-size:80%; color:gray;'>Last updated: {last_updated}</p>", unsafe_allow_html=True)
 
@@ -197,19 +313,24 @@ def main():
         </div>
         """, unsafe_allow_html=True)
 
-    if df.empty:
+    if not has_decisions(DB_PATH):
         st.warning("No data found in database.")
     else:
         st.subheader("🔎 Look Up Application Number")
         app_num = st.text_input("Enter Application Number (case insensitive):")
         if app_num:
-            results = df[df["application_number"].str.lower() == app_num.strip().lower()]
+            results = lookup_application(DB_PATH, app_num, data_version)
             if not results.empty:
                 st.success(f"Found {len(results)} result(s):")
                 st.table(results)
             else:
                 st.error("No matching application number found.")
         else:
+            # Every step below is cached on data_version (see cache_stats);
+            # the Back/Forward buttons only rerun chart_section
+            summary = load_summary(DB_PATH, data_version)
+            adv_summary = load_advanced_stats(DB_PATH, data_version)  # CHANGED / NEW
+
             # --- Weekly summary table reversed & header fixed
             summary_for_table = summary.iloc[::-1].reset_index(drop=True)
             st.subheader("📋 Weekly Summary Table")
@@ -224,9 +345,7 @@ def main():
             )
 
             # --- Show chart with moving average & % change
-            fig = show_chart(summary)
-                # now i removed the streamlit logic from show_chart I should rename it to generate_chart or similar
-            st.pyplot(fig)
+            chart_section(data_version)
 
             # Button styling
             st.markdown("""
@@ -261,22 +380,15 @@ def main():
             # st.write("this is fig printed  ido not know what fig is:")
             # st.write("fig object type:", type(fig))
             # st.write(fig)
+            if "debug" in st.query_params:
+                st.write(cache_stats())
             ########################################
 
-            # --- Downloads ---
-            buf = io.BytesIO()
-            fig.savefig(buf, format="png", dpi=200)
-            buf.seek(0)
-            st.download_button("⬇️ Download Chart as PNG", buf, "weekly_chart.png", "image/png")
-
-            # CSV with moving average and % change
-            summary_for_csv = summary.copy()
-            summary_for_csv["Total_3wk_MA"] = adv_summary["Total_3wk_MA"]
-            summary_for_csv["Total_pct_change"] = adv_summary["Total_pct_change"]
-            csv_summary = summary_for_csv.to_csv(index=False).encode("utf-8")
+            # --- Downloads --- (the chart PNG is in chart_section)
+            csv_summary = summary_csv(DB_PATH, data_version)
             st.download_button("⬇️ Download Weekly Summary (CSV)", csv_summary, "visa_summary.csv", "text/csv")
 
-            csv_full = df.to_csv(index=False).encode("utf-8")
+            csv_full = full_csv(DB_PATH, data_version)
             st.download_button("⬇️ Download Full Application Data (CSV)", csv_full, "visa_decisions_full.csv", "text/csv")
 
     st.write("Data sourced from: https://www.irishimmigration.ie/south-africa-visa-desk/#tourist")
@@ -303,20 +415,9 @@ def main():
         st.info("No update message found yet.")
 
 def run_cli():
-    from send_email import send_figure_email
-    db_mtime = os.path.getmtime(DB_PATH)
-    msg_mtime = os.path.getmtime(MSG_PATH)
-    dash_mtime = os.path.getmtime(DASHBOARD_PATH)
-
-    df, message = load_data(DB_PATH, MSG_PATH, db_mtime, msg_mtime, dash_mtime)
-    summary = compute_stats(df)
-    fig = show_chart(summary)
-
-    # Send email with chart
-    send_figure_email(fig)
-
-    # print(summary)
-    # fig.savefig(f"weekly_summary_{datetime.now().strftime('%Y-%m-%d')}.png")
+    # email_cli is the light entry point for cron; this keeps -c working
+    import email_cli
+    email_cli.main()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shared SQLite connections for decisions.db.
+The dashboard and the data pipeline both open the database through
+connect(), so every connection gets the same settings:
+
+- WAL journal, so dashboard reads keep seeing the last committed data while
+  the processor is in the middle of a large insert
+- synchronous=NORMAL, which is crash-safe under WAL and skips an fsync per
+  commit
+- a 64 MiB page cache and 256 MiB of memory-mapped reads
+- a busy timeout, so a second writer waits for the lock instead of failing
+
+Connections stay open and are reused for the life of the process. sqlite3
+connections cannot be shared between threads by default, so each thread
+(a Streamlit session, a pipeline stage) gets its own.
+"""
+
+import os
+import sqlite3
+import threading
+
+import logging
+logger = logging.getLogger(__name__)
+
+BUSY_TIMEOUT_MS = 10_000
+CACHE_SIZE_KIB = 64 * 1024
+MMAP_SIZE = 256 * 1024 * 1024
+
+_local = threading.local()
+
+
+def open_connection(db_path):
+    """Open a new connection to db_path with the shared pragmas applied."""
+    conn = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT_MS / 1000)
+    conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+    # journal_mode is stored in the file, so this only does work the first time
+    mode = conn.execute("PRAGMA journal_mode = WAL").fetchone()[0]
+    if mode.lower() != "wal":
+        logger.warning(f"Could not enable WAL on {db_path}, journal_mode is {mode}")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute(f"PRAGMA cache_size = -{CACHE_SIZE_KIB}")
+    conn.execute(f"PRAGMA mmap_size = {MMAP_SIZE}")
+    return conn
+
+
+def is_open(conn):
+    try:
+        conn.execute("SELECT 1")
+        return True
+    except sqlite3.ProgrammingError:
+        return False
+
+
+def connect(db_path):
+    """Return this thread's connection to db_path, opening it if needed.
+
+    The connection is shared with every other caller on the same thread, so
+    callers commit their own work and do not close it. A connection that was
+    closed anyway is transparently reopened.
+    """
+    key = os.path.abspath(db_path)
+    connections = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+    conn = connections.get(key)
+    if conn is None or not is_open(conn):
+        conn = connections[key] = open_connection(key)
+    return conn
+
+
+def checkpoint(db_path):
+    """Copy everything in the WAL back into db_path and empty the WAL.
+
+    Run this before copying or committing the .db file on its own, since
+    recent commits may only exist in the -wal file.
+    """
+    busy, log_frames, checkpointed = connect(db_path).execute(
+        "PRAGMA wal_checkpoint(TRUNCATE)"
+    ).fetchone()
+    if busy:
+        logger.warning(f"WAL checkpoint of {db_path} was blocked by a reader ({checkpointed}/{log_frames} frames)")
+    return not busy
+
+
+# === DATA VERSION ===
+# A counter in settings that the loader bumps in the same transaction as any
+# batch that adds decisions. The dashboard keys its caches on it, so new data
+# invalidates them without touching dashboard.py.
+DATA_VERSION_KEY = "data_version"
+
+
+def data_version(conn):
+    """Return the current data version, 0 if it has never been bumped."""
+    try:
+        row = conn.execute(
+            "SELECT value FROM settings WHERE setting = ?", (DATA_VERSION_KEY,)
+        ).fetchone()
+    except sqlite3.OperationalError:
+        return 0  # no settings table yet
+    return int(row[0]) if row else 0
+
+
+def bump_data_version(conn):
+    """Increment the data version (not committed)."""
+    conn.execute("""
+        INSERT INTO settings (setting, value) VALUES (?, '1')
+        ON CONFLICT(setting) DO UPDATE SET value = CAST(value AS INTEGER) + 1
+    """, (DATA_VERSION_KEY,))
+
+
+def close_all():
+    """Close this thread's connections (e.g. before deleting the files)."""
+    for conn in getattr(_local, "connections", {}).values():
+        conn.close()
+    _local.connections = {}
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Email the latest weekly decisions chart (the dashboard's -c mode).
+Meant for cron: it only imports sqlite and smtplib on the normal path,
+sending the tile the processor pre-rendered for the current data version.
+Streamlit, pandas and matplotlib are only loaded when that tile is missing
+and the chart has to be drawn the way the dashboard draws it.
+
+    python email_cli.py
+    python dashboard.py -c    # same thing, after importing streamlit
+"""
+
+import os
+import sqlite3
+
+import charts
+import db_conn
+
+import logging
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_PATH = os.path.join(BASE_DIR, "decisions.db")
+
+
+def count_weeks(conn):
+    """Rows in weekly_summary, or None if the table does not exist yet."""
+    try:
+        return conn.execute("SELECT COUNT(*) FROM weekly_summary").fetchone()[0]
+    except sqlite3.OperationalError:
+        return None
+
+
+def latest_chart(db_path=DB_PATH):
+    """PNG bytes of the most recent chart window."""
+    conn = db_conn.connect(db_path)
+    data_version = db_conn.data_version(conn)
+    n_weeks = count_weeks(conn)
+    if n_weeks is not None:
+        tile = charts.get_tile(conn, data_version, charts.default_start(n_weeks))
+        if tile is not None:
+            return tile
+
+    logger.info("No chart tile for data version %s, drawing it", data_version)
+    import dashboard
+
+    summary = dashboard.load_summary(db_path, data_version)
+    return dashboard.chart_png(db_path, data_version, charts.default_start(len(summary)))
+
+
+def main():
+    from send_email import send_chart_email
+
+    send_chart_email(latest_chart())
+
+
+if __name__ == "__main__":
+    main()
@@ -2,41 +2,66 @@ import smtplib
 from email.message import EmailMessage
 import io
 import os
-from dotenv import load_dotenv
 from datetime import datetime
 
 
-BASE_DIR = os.path.dirname(__file__)  # folder where this script lives
-os.chdir(BASE_DIR)  # optionally change current working directory
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))  # folder where this script lives
+LOGO_PATH = os.path.join(BASE_DIR, "BISA-Logo-250.png")
 
-# --- Load local .env if it exists ---
-load_dotenv()  # will do nothing if no .env is present
+SMTP_SERVER = "smtp.businessirelandsa.co.za"
+SMTP_PORT = 465
 
-# --- Get credentials from environment ---
-USERNAME = os.environ.get("USERNAME")
-PASSWORD = os.environ.get("PASSWORD")
 
-if not USERNAME or not PASSWORD:
-    raise RuntimeError("USERNAME or PASSWORD environment variable not set!")
+def get_credentials():
+    """
+    Read the SMTP login from the environment (or a local .env).
+    Done when an email is sent rather than at import, so importing this
+    module costs nothing.
+    """
+    from dotenv import load_dotenv
+
+    # --- Load local .env if it exists ---
+    load_dotenv()  # will do nothing if no .env is present
+
+    # --- Get credentials from environment ---
+    username = os.environ.get("USERNAME")
+    password = os.environ.get("PASSWORD")
+
+    if not username or not password:
+        raise RuntimeError("USERNAME or PASSWORD environment variable not set!")
+    return username, password
+
+
+def smtp_connection():
+    """
+    Open the SMTP SSL connection reports are sent over. Kept separate so
+    benchmarks/bench_suite.py can send to a local SMTP server instead.
+    """
+    return smtplib.SMTP_SSL(SMTP_SERVER, SMTP_PORT)
 
 
 def send_figure_email(fig):
     """
     Send a matplotlib figure as an inline image email.
-    Both the chart and the BISA logo are embedded inline.
     """
 
     # --- Save chart figure to a BytesIO buffer ---
     buf = io.BytesIO()
     fig.savefig(buf, format="png", dpi=200)
-    buf.seek(0)
-    chart_bytes = buf.read()
+    return send_chart_email(buf.getvalue())
+
+
+def send_chart_email(chart_bytes):
+    """
+    Send PNG chart bytes (e.g. a pre-rendered chart tile) as an inline image email.
+    Both the chart and the BISA logo are embedded inline.
+    """
+    username, password = get_credentials()
 
     # --- Load BISA logo from local file ---
-    logo_path = "BISA-Logo-250.png"
-    if not os.path.exists(logo_path):
-        raise RuntimeError(f"Logo file not found: {logo_path}")
-    with open(logo_path, "rb") as f:
+    if not os.path.exists(LOGO_PATH):
+        raise RuntimeError(f"Logo file not found: {LOGO_PATH}")
+    with open(LOGO_PATH, "rb") as f:
         logo_bytes = f.read()
 
     recipients = [
@@ -125,15 +150,11 @@ def send_figure_email(fig):
     )
 
     # --- Send email via SMTP SSL ---
-    smtp_server = "smtp.businessirelandsa.co.za"
-    smtp_port = 465
-
-    with smtplib.SMTP_SSL(smtp_server, smtp_port) as s:
-        s.login(USERNAME, PASSWORD)
+    with smtp_connection() as s:
+        s.login(username, password)
         s.send_message(msg, to_addrs=recipients)
 
     print("Email sent successfully!")
-    buf.close()
     return True
 
 
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Weekly decision counts and trends, computed in one pass.
+summarize() turns a frame of decisions (one row per application: week,
+decision, start_date, end_date) into the dashboard's weekly summary. Weeks
+and decisions are reduced to integer codes (for free if the columns are
+already categorical, as load_decisions returns them), decisions are
+normalized once per distinct value rather than once per row, and every
+(week, decision) count comes out of a single np.bincount.
+
+No Streamlit here, so the pipeline, benchmarks and notebooks can use it;
+dashboard.compute_stats and dashboard.advanced_stats are thin wrappers.
+"""
+
+import numpy as np
+import pandas as pd
+
+import logging
+logger = logging.getLogger(__name__)
+
+# The decisions Total and Refused % are made of; any other decision still
+# gets its own column, as in the per-week value_counts this replaces
+COUNTED = ["Approved", "Refused"]
+
+
+def codes_of(column):
+    """(integer codes, distinct values) of a column, codes in order of
+    first appearance; categorical columns reuse their own codes."""
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        return column.cat.codes.to_numpy(), column.cat.categories
+    return pd.factorize(column)
+
+
+def normalized_decisions(column):
+    """Decision codes after strip().capitalize(), and their labels.
+
+    Only the distinct values are normalized; codes of values that collapse
+    to the same label (" approved", "APPROVED") are merged.
+    """
+    codes, values = codes_of(column)
+    labels = pd.Index(values).astype(str).str.strip().str.capitalize()
+    merged, distinct = pd.factorize(labels)
+    if len(merged) == len(distinct):
+        return codes, distinct  # already normalized, or no decisions at all
+    # one take per row; the extra -1 at the end maps missing (-1) to itself
+    return np.append(merged, -1).astype(codes.dtype)[codes], distinct
+
+
+def first_rows(week_codes, n_weeks):
+    """Position of each week's first row, indexed by week code (0 for a
+    code with no rows)."""
+    seen = pd.Series(week_codes).drop_duplicates()
+    first = np.zeros(n_weeks, dtype=np.int64)
+    first[seen.to_numpy()] = seen.index.to_numpy()
+    return first
+
+
+def add_trends(summary):
+    """Add the 3-week moving average and week-to-week % change of Total (in place)."""
+    total = summary["Total"].to_numpy(dtype=float)
+    window = np.cumsum(total)
+    window[3:] -= window[:-3].copy()
+    summary["Total_3wk_MA"] = window / np.minimum(np.arange(1, len(total) + 1), 3)
+    # as pct_change().fillna(0): a week after an empty one is inf, 0 after 0 is 0
+    change = np.zeros(len(total))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        change[1:] = total[1:] / total[:-1] - 1
+    change[np.isnan(change)] = 0
+    summary["Total_pct_change"] = change * 100
+    return summary
+
+
+def summarize(df, trends=True):
+    """Weekly summary of df, sorted by end_date.
+
+    Columns: week, one count per decision (Approved, Refused, ...), Total,
+    Refused %, end_date, start_date and, with trends, Total_3wk_MA and
+    Total_pct_change. Rows with no week or no decision are not counted.
+    """
+    week_codes, weeks = codes_of(df["week"])
+    decision_codes, decisions = normalized_decisions(df["decision"])
+    rows = None
+    if len(week_codes) and min(week_codes.min(), decision_codes.min()) < 0:
+        keep = (week_codes >= 0) & (decision_codes >= 0)
+        rows = np.flatnonzero(keep)
+        week_codes, decision_codes = week_codes[keep], decision_codes[keep]
+
+    weeks = pd.Index(weeks)
+    n_weeks, n_decisions = len(weeks), len(decisions)
+    counts = np.bincount(
+        week_codes.astype(np.int64) * n_decisions + decision_codes, minlength=n_weeks * n_decisions
+    ).reshape(n_weeks, n_decisions)
+    first = first_rows(week_codes, n_weeks)
+    if rows is not None:
+        first = rows[first]
+    # unused categories are weeks with no rows
+    present = counts.any(axis=1)
+    if not present.all():
+        counts, weeks, first = counts[present], weeks[present], first[present]
+
+    summary = pd.DataFrame({"week": weeks.to_numpy()})
+    for code in np.argsort(decisions.to_numpy()):
+        if counts[:, code].any():
+            summary[decisions[code]] = counts[:, code]
+    counted = [name for name in COUNTED if name in summary]
+    summary["Total"] = summary[counted].sum(axis=1) if counted else 0
+    refused = summary["Refused"] if "Refused" in summary else 0
+    summary["Refused %"] = (refused / summary["Total"] * 100).round(2)
+
+    summary["end_date"] = df["end_date"].to_numpy()[first]
+    summary["start_date"] = df["start_date"].to_numpy()[first]
+    # weeks in label order first, so weeks sharing an end_date keep the
+    # order the old per-week groupby gave them
+    summary = summary.sort_values("week", kind="stable").sort_values("end_date", kind="stable").reset_index(drop=True)
+    if trends:
+        add_trends(summary)
+    return summary